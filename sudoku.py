@@ -1,10 +1,44 @@
+import os
 import random
 import time
+from array import array
+from math import isqrt
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from sudoku_sat import SatSolver
 
 bits2list_cache = []
 bits2list_cache_l = []
 pointing_cache = []
 
+# characters for cell values in the textual form, 0 is an empty cell (boards up to 35x35)
+VALUE_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# tables of the propagation kernel for 9x9 boards, built by init_unit_tables:
+# UNITS[u] - 9 cells of the unit (units 0..8 are rows, 9..17 columns, 18..26 3x3 squares),
+# UNITS_OF[idx] - 3 units of the cell, PEERS[idx] - 20 cells sharing a unit with the cell,
+# BOX_SEGMENTS[sq] - for each of 3 rows and 3 columns of the 3x3 square:
+# (3 cells of the square in that line, 6 cells of the line outside of the square)
+UNITS = []
+UNITS_OF = []
+PEERS = []
+BOX_SEGMENTS = []
+# the same tables for the other sizes of the board, by the size n, built on demand by unit_tables
+unit_tables_cache = {}
+
+# dancing links exact cover matrix for the empty 9x9 board:
+# node 0 is the root, nodes 1..324 are column headers (constraints),
+# then 4 nodes for each of 729 rows (candidates "value val in cell idx", row id = idx * 9 + val)
+DLX_ROOT = 0
+DLX_FIRST_NODE = 325
+dlx_left = []
+dlx_right = []
+dlx_up = []
+dlx_down = []
+dlx_col = []
+
 def get_finger(n):
     sq = [[0 for col in range(3)] for row in range(3)]
     cnt = 0
@@ -39,6 +73,105 @@ def init_caches():
     for i in range(512):
         pointing_cache.append(get_finger(i))
 
+    init_unit_tables()
+    init_dlx_matrix()
+
+
+def build_unit_tables(n):
+    """ Build (units, units of each cell, peers, box segments) tables for n x n board.
+    n should be a square (4, 9, 16, 25, ...), boxes are sqrt(n) x sqrt(n)"""
+    b = isqrt(n)
+    units = []
+    for r in range(n):
+        units.append(tuple(r * n + c for c in range(n)))
+    for c in range(n):
+        units.append(tuple(r * n + c for r in range(n)))
+    for sq in range(n):
+        units.append(tuple(((sq // b) * b + i // b) * n + (sq % b) * b + i % b for i in range(n)))
+
+    units_of = []
+    for idx in range(n * n):
+        r = idx // n
+        c = idx % n
+        units_of.append((r, n + c, 2 * n + (r // b) * b + c // b))
+
+    peers = []
+    for idx in range(n * n):
+        tmp = []
+        for u in units_of[idx]:
+            for p in units[u]:
+                if p != idx and not (p in tmp):
+                    tmp.append(p)
+        peers.append(tuple(tmp))
+
+    box_segments = []
+    for sq in range(n):
+        box = 2 * n + sq
+        segments = []
+        for i in range(b):
+            line = units[(sq // b) * b + i]
+            segments.append((tuple(p for p in line if units_of[p][2] == box),
+                             tuple(p for p in line if units_of[p][2] != box)))
+        for i in range(b):
+            line = units[n + (sq % b) * b + i]
+            segments.append((tuple(p for p in line if units_of[p][2] == box),
+                             tuple(p for p in line if units_of[p][2] != box)))
+        box_segments.append(tuple(segments))
+
+    return (units, units_of, peers, box_segments)
+
+def init_unit_tables():
+    """ Build UNITS, UNITS_OF, PEERS and BOX_SEGMENTS tables """
+    (units, units_of, peers, box_segments) = build_unit_tables(9)
+    UNITS.extend(units)
+    UNITS_OF.extend(units_of)
+    PEERS.extend(peers)
+    BOX_SEGMENTS.extend(box_segments)
+    unit_tables_cache[9] = (UNITS, UNITS_OF, PEERS, BOX_SEGMENTS)
+
+def unit_tables(n):
+    """ (units, units of each cell, peers, box segments) tables for n x n board """
+    tables = unit_tables_cache.get(n)
+    if tables is None:
+        tables = build_unit_tables(n)
+        unit_tables_cache[n] = tables
+
+    return tables
+
+
+def dlx_columns(idx, val):
+    """ Constraint columns, covered by putting the value val (0..8) to the cell idx:
+    the cell itself, value in the row, value in the column, value in the 3x3 square"""
+    r = idx // 9
+    c = idx % 9
+    sq = (r // 3) * 3 + c // 3
+    return (1 + idx, 82 + r * 9 + val, 163 + c * 9 + val, 244 + sq * 9 + val)
+
+def init_dlx_matrix():
+    """ Build the vertical links of the exact cover matrix, shared by all boards.
+    Links between column headers are set up for each board by Sudoku.solve_board_dlx"""
+    nnodes = DLX_FIRST_NODE + 729 * 4
+    dlx_left.extend(range(nnodes))
+    dlx_right.extend(range(nnodes))
+    dlx_up.extend(range(nnodes))
+    dlx_down.extend(range(nnodes))
+    dlx_col.extend(range(nnodes))
+
+    for row in range(729):
+        first = DLX_FIRST_NODE + row * 4
+        cols = dlx_columns(row // 9, row % 9)
+        for j in range(4):
+            node = first + j
+            h = cols[j]
+            dlx_col[node] = h
+            dlx_left[node] = first + (j + 3) % 4
+            dlx_right[node] = first + (j + 1) % 4
+            # append the node to the bottom of the column
+            dlx_up[node] = dlx_up[h]
+            dlx_down[node] = h
+            dlx_down[dlx_up[h]] = node
+            dlx_up[h] = node
+
 
 # def bits2list(n):
 #     return list(bits2list_cache[n])
@@ -52,13 +185,14 @@ def list2bits(vals):
 
 
 def poss2list(poss):
-    """ Covert a solution represented as a 9x9 matrix, elements of which are bit-encoded sets
+    """ Covert a solution represented as a 9x9 (n x n) matrix, elements of which are bit-encoded sets
      to the matrix of integers"""
+    n = isqrt(len(poss))
     res = []
-    for r in range(9):
+    for r in range(n):
         tmp = []
-        for c in range(9):
-            tmp.append(bits2list_cache[poss[r * 9 + c]][0])
+        for c in range(n):
+            tmp.append(poss[r * n + c].bit_length())
 
         res.append(tmp)
 
@@ -76,30 +210,208 @@ def max_index(x):
 
     return best_idx
 
+def bits2list(m):
+    """ List of values in the bit-encoded set, in increasing order, for sets of any size"""
+    res = []
+    while m != 0:
+        bit = m & -m
+        res.append(bit.bit_length())
+        m = m ^ bit
+
+    return res
+
 def is_solved(poss):
     """ Given a matrix of possibilities (each element is a bit-encoded set, representing possible values for the cell),
     check if it is a solution (only one possibility for eac cell)"""
-    for r in range(9):
-        for c in range(9):
-            if bits2list_cache_l[poss[r * 9 + c]]>1:
-                return False
+    for p in poss:
+        if (p & (p - 1)) != 0:
+            return False
 
     return True
 
 def sudoku_state2str(state):
-    """ Convert to the textual form the sudoku board, represented by 9x9 matrix of integers"""
+    """ Convert to the textual form the sudoku board, represented by 9x9 (n x n) matrix of integers.
+    Values above 9 are written as letters, A for 10"""
     res = ""
-    for r in range(9):
-        for c in range(9):
-            res = res + str(state[r][c])
+    for row in state:
+        for cell in row:
+            res = res + VALUE_CHARS[cell]
         res = res + "\n"
 
     return res
 
+def propagate_incremental(poss, singles, dirty, tricks, trail, n=9, queued=None):
+    """ Event-driven propagation kernel. singles is the worklist of cells, whose single value
+    should be removed from the peers, dirty is the list of units changed since the last examination.
+    With tricks, the dirty units (and only them) are examined for "only one in unit",
+    pointing and naked pairs/triplets, until nothing changes.
+    Every change of poss is recorded on the trail, unless it is None (nothing is rolled back).
+    Return False, if we met conflicts.
+    n is the size of the board, the tables for it are taken from unit_tables.
+    queued (3 * n flags, set for the units in dirty) is reused, if it is not None: the flags are left set
+    for the units, which are still in dirty on return"""
+    (units, units_of, peers, box_segments) = unit_tables(n)
+    all_values = (1 << n) - 1
+    b = len(box_segments[0]) // 2
+    if queued is None:
+        queued = [False] * (3 * n)
+    for u in dirty:
+        queued[u] = True
+
+    while True:
+        # remove values of the single cells from their peers
+        while len(singles) > 0:
+            idx = singles.pop()
+            bit = poss[idx]
+            for p in peers[idx]:
+                m = poss[p]
+                if (m & bit) != 0:
+                    if trail is not None:
+                        trail.append(p)
+                        trail.append(m)
+                    m = m & ~bit
+                    poss[p] = m
+                    if (m & (m - 1)) == 0:
+                        if m == 0:
+                            return False
+                        singles.append(p)
+                    if tricks:
+                        for u in units_of[p]:
+                            if not queued[u]:
+                                queued[u] = True
+                                dirty.append(u)
+
+        if not tricks or len(dirty) == 0:
+            return True
+
+        unit = dirty.pop()
+        queued[unit] = False
+        cells = units[unit]
+        changed = []
+
+        # bit-parallel "seen once" / "seen twice" accumulators over the cells of the unit
+        once = 0
+        twice = 0
+        for p in cells:
+            m = poss[p]
+            twice = twice | (once & m)
+            once = once | m
+
+        if once != all_values:
+            # some value has no place in the unit
+            return False
+
+        # set the cells, which are the only place for a value in the unit
+        only = once & ~twice
+        if only != 0:
+            for p in cells:
+                h = poss[p] & only
+                if h != 0 and h != poss[p]:
+                    if (h & (h - 1)) != 0:
+                        # the only place for two values
+                        return False
+                    if trail is not None:
+                        trail.append(p)
+                        trail.append(poss[p])
+                    poss[p] = h
+                    singles.append(p)
+                    changed.append(p)
+
+        # values in the square, possible only in one row (column) of it,
+        # are removed from the rest of that row (column)
+        if unit >= 2 * n:
+            segments = box_segments[unit - 2 * n]
+            for k in (0, b):
+                seg_vals = []
+                seg_once = 0
+                seg_twice = 0
+                for i in range(b):
+                    vals = 0
+                    for p in segments[k + i][0]:
+                        vals = vals | poss[p]
+                    seg_vals.append(vals)
+                    seg_twice = seg_twice | (seg_once & vals)
+                    seg_once = seg_once | vals
+                for i in range(b):
+                    pointing = seg_vals[i] & ~seg_twice
+                    if pointing != 0:
+                        for p in segments[k + i][1]:
+                            m = poss[p]
+                            if (m & pointing) != 0:
+                                if trail is not None:
+                                    trail.append(p)
+                                    trail.append(m)
+                                m = m & ~pointing
+                                poss[p] = m
+                                if (m & (m - 1)) == 0:
+                                    if m == 0:
+                                        return False
+                                    singles.append(p)
+                                changed.append(p)
+
+        # naked pairs and triplets
+        vals = [poss[p] for p in cells]
+        npt = search_naked_pair_or_triplet(vals)
+        if npt is None:
+            return False
+
+        for np in npt:
+            np_bits = vals[np[0]]
+            for i in range(n):
+                p = cells[i]
+                m = poss[p]
+                if not (i in np) and (m & np_bits) != 0:
+                    if trail is not None:
+                        trail.append(p)
+                        trail.append(m)
+                    m = m & ~np_bits
+                    poss[p] = m
+                    if (m & (m - 1)) == 0:
+                        if m == 0:
+                            return False
+                        singles.append(p)
+                    changed.append(p)
+
+        for p in changed:
+            for u in units_of[p]:
+                if not queued[u]:
+                    queued[u] = True
+                    dirty.append(u)
+
+def is_valid_solution(poss):
+    """ Given a matrix of possibilities with one possibility for each cell,
+    check that every row, column and square contains all the values"""
+    n = isqrt(len(poss))
+    all_values = (1 << n) - 1
+    for unit in unit_tables(n)[0]:
+        vals = 0
+        for p in unit:
+            vals = vals | poss[p]
+        if vals != all_values:
+            return False
+
+    return True
+
+def sudoku_state2line(state):
+    """ Convert the sudoku board, represented by 9x9 (n x n) matrix of integers, to one line of 81 (n * n) characters"""
+    return "".join([VALUE_CHARS[cell] for row in state for cell in row])
+
+def sudoku_str2state(s):
+    """ Convert the textual form of the board (81 digits, '0' or '.' for empty cells,
+    whitespace is ignored; n * n characters for n x n boards, A for 10, etc.) to 9x9 (n x n) matrix of integers"""
+    cells = "".join(s.split()).replace(".", "0").upper()
+    n = isqrt(len(cells))
+    if n < 4 or n * n != len(cells) or isqrt(n) ** 2 != n or cells.strip(VALUE_CHARS[:n + 1]) != "":
+        my_error = ValueError("{0!r} is not a valid Sudoku board!".format(s))
+        raise my_error
+
+    return [[VALUE_CHARS.index(cells[r * n + c]) for c in range(n)] for r in range(n)]
+
 def copy_state(state):
-    return [[state[row][col] for col in range(9)] for row in range(9)]
+    return [list(row) for row in state]
 
 def nfish_check(poss):
+    """ Check that each value has enough rows and columns left for its missing cells (9x9 boards only)"""
     nleft = [9] * 9
     poss_cols = [0] * 9
     poss_rows = [0] * 9
@@ -124,11 +436,11 @@ def nfish_check(poss):
 
 def search_naked_pair_or_triplet(poss):
     res = []
-    for i in range(9):
-        l = bits2list_cache_l[poss[i]]
+    for i in range(len(poss)):
+        l = poss[i].bit_count()
         if l == 2:
             found = [i]
-            for j in range(i + 1, 9):
+            for j in range(i + 1, len(poss)):
                 if poss[j] == poss[i]:
                     found.append(j)
             if len(found) == 2:
@@ -137,7 +449,7 @@ def search_naked_pair_or_triplet(poss):
                 return None
         elif l == 3:
             found = [i]
-            for j in range(i + 1, 9):
+            for j in range(i + 1, len(poss)):
                 if poss[j] == poss[i]:
                     found.append(j)
             if len(found) == 3:
@@ -149,6 +461,8 @@ def search_naked_pair_or_triplet(poss):
 
 
 def is_same_sq(np):
+    """ Check if the cells of the naked pair/triplet (positions 0..8 in a row or column of the 9x9 board)
+    are in one 3x3 square"""
     if len(np) == 2:
         if (np[0] // 3) != (np[1] // 3):
             return False
@@ -159,19 +473,672 @@ def is_same_sq(np):
     return True
 
 
+def undo_trail(poss, trail, mark):
+    """ Roll back the changes of possibilities, recorded on the trail after the mark.
+    The trail is a flat array of (index, old bit-encoded set) pairs"""
+    while len(trail) > mark:
+        old = trail.pop()
+        poss[trail.pop()] = old
+
+
+class SearchScratch:
+    """ Lists of count_possibilities and search_buffer for n x n boards: possibilities, the first solution,
+    the cells to fill, the worklists of propagate_incremental, the trail and the frames of the search
+    (by the depth). A search allocates nothing per node in them. An object serves one search at a time:
+    a thread (or a nested search) needs an object of its own"""
+
+    def __init__(self, n=9):
+        cells = n * n
+        self.n = n
+        self.poss = [0] * cells
+        self.first = [0] * cells
+        self.empty_idx = [0] * cells
+        self.singles = []
+        self.dirty = []
+        self.queued = [False] * (3 * n)
+        self.trail = array("i")
+        # frames of the search: position in empty_idx, cell index, bit-encoded set of values not tried yet, trail mark
+        self.frame_k = [0] * cells
+        self.frame_idx = [0] * cells
+        self.frame_values = [0] * cells
+        self.frame_mark = [0] * cells
+
+
+def search_possibilities(poss, tricks, trail, n=9, scratch=None, order=None, rng=None):
+    """ Generate the solutions of the n x n board from its (propagated) possibilities, with the backtracking
+    and the event-driven propagation. Each solution is poss itself, copy it to keep it. Changes of poss are
+    recorded on the trail and rolled back, when the search is over or the generator is closed.
+    The empty cells are visited in the order of order (all n * n indexes, range(n * n) if it is None),
+    the cell with minimum possibilities first; the values are tried from the lowest, or in a random order,
+    if rng (rng(m) returns a value in range 0..(m-1)) is not None.
+    The search runs in the lists of scratch (a SearchScratch for n), a new one if it is None"""
+    if scratch is None:
+        scratch = SearchScratch(n)
+    if order is None:
+        order = range(n * n)
+    units_of = unit_tables(n)[1]
+    empty_idx = scratch.empty_idx
+    singles = scratch.singles
+    dirty = scratch.dirty
+    queued = scratch.queued
+    frame_k = scratch.frame_k
+    frame_idx = scratch.frame_idx
+    frame_values = scratch.frame_values
+    frame_mark = scratch.frame_mark
+    start = len(trail)
+    # cells with more than 1 possibility (empty_idx[:end]), the cells with 1 possibility are moved in front of
+    # empty_idx[k]
+    end = 0
+    for idx in order:
+        if (poss[idx] & (poss[idx] - 1)) != 0:
+            empty_idx[end] = idx
+            end += 1
+    k = 0
+    depth = 0
+    try:
+        while True:
+            for i in range(k, end):
+                m = poss[empty_idx[i]]
+                if (m & (m - 1)) == 0:
+                    tmp = empty_idx[k]
+                    empty_idx[k] = empty_idx[i]
+                    empty_idx[i] = tmp
+                    k += 1
+
+            if k == end:
+                if is_valid_solution(poss):
+                    yield poss
+            else:
+                # look for the cell with minimum possibilities
+                best = k
+                best_l = n + 1
+                for i in range(k, end):
+                    l = poss[empty_idx[i]].bit_count()
+                    if l < best_l:
+                        best = i
+                        best_l = l
+                        if l <= 2:
+                            break
+
+                idx = empty_idx[best]
+                empty_idx[best] = empty_idx[k]
+                empty_idx[k] = idx
+                frame_k[depth] = k
+                frame_idx[depth] = idx
+                frame_values[depth] = poss[idx]
+                frame_mark[depth] = len(trail)
+                depth += 1
+
+            # try the next value for the innermost cell, go back to the previous cell, if all values were tried
+            found_next = False
+            while depth > 0 and not found_next:
+                top = depth - 1
+                k = frame_k[top]
+                idx = frame_idx[top]
+                values = frame_values[top]
+                undo_trail(poss, trail, frame_mark[top])
+                if values == 0:
+                    depth = top
+                    continue
+
+                if rng is None:
+                    bit = values & -values
+                else:
+                    m = values
+                    for i in range(rng(values.bit_count())):
+                        m &= m - 1
+                    bit = m & -m
+                frame_values[top] = values & ~bit
+                trail.append(idx)
+                trail.append(poss[idx])
+                poss[idx] = bit
+                # the worklists are left over by the previous propagation, queued[u] is set for the units in dirty
+                for u in dirty:
+                    queued[u] = False
+                del dirty[:]
+                del singles[:]
+                singles.append(idx)
+                dirty.extend(units_of[idx])
+                found_next = propagate_incremental(poss, singles, dirty, tricks, trail, n, queued)
+                k += 1
+
+            if not found_next:
+                return
+    finally:
+        undo_trail(poss, trail, start)
+
+
+def count_possibilities(poss, limit, tricks, trail, solutions=None, n=9, first=None, scratch=None, order=None,
+                        rng=None):
+    """ Count solutions of the n x n board from its (propagated) possibilities up to limit,
+    with search_possibilities (see it for trail, scratch, order and rng). Found solutions (copies of poss)
+    are added to solutions, if it is not None; the first one is copied into first (a list of n * n),
+    if it is not None"""
+    count = 0
+    search = search_possibilities(poss, tricks, trail, n, scratch, order, rng)
+    for p in search:
+        if solutions is not None:
+            solutions.append(list(p))
+        if first is not None and count == 0:
+            first[:] = p
+        count += 1
+        if count >= limit:
+            break
+
+    search.close()
+    return count
+
+
+def pack_state(state):
+    """ Pack the n x n board into one integer: the size, then 4 bits (for n > 15 - more) for each cell.
+    A 9x9 board takes 41 bytes, instead of a tuple of tuples"""
+    n = len(state)
+    bits = n.bit_length()
+    key = n
+    for row in state:
+        for cell in row:
+            key = (key << bits) | cell
+
+    return key
+
+def canonical_form(state):
+    """ Canonical form of the board under the Sudoku symmetries: transposition, permutations of bands
+    (stacks) and of rows (columns) within them, and renumbering of the values.
+    This is the lexicographically minimal (row by row) board among all equivalent ones, with the values
+    renumbered in the order of their first appearance, so two boards are equivalent if their forms are equal.
+    Return (form, transform), apply_transform(state, transform) gives the form.
+    The values of a row are different, so the first row of the form is set by its empty cells only.
+    For each pair of source rows of a band the column orders are searched, keeping the second row of the form
+    not greater, than the best one found so far, and only the orders, giving the minimal first two rows,
+    are passed to the search of the other rows. The other rows of a full grid are just ordered by their first cells.
+    The search is exhaustive over the orders, tying on the rows so far, so it costs milliseconds per 9x9 board,
+    several times more for sparse or highly symmetric boards: hundreds of thousands of boards per hour on a core,
+    not millions (sudoku_bench.bench_canonical_form measures it)"""
+    n = len(state)
+    b = isqrt(n)
+    cells = n * n
+    best = [0] * cells
+    # number of the leading cells of best, which are reached by the current best branch
+    known = 0
+    best_transform = None
+
+    relabel = [0] * (n + 1)
+    next_label = 1
+    rows = []
+    cols = []
+
+    def put(pos, v):
+        """ Renumber v and compare it with the best board at pos.
+        Return the renumbered value, or -1, if the branch is worse, than the best one"""
+        nonlocal known, next_label
+        if v != 0:
+            if relabel[v] == 0:
+                relabel[v] = next_label
+                next_label += 1
+            v = relabel[v]
+        if pos >= known:
+            best[pos] = v
+            known = pos + 1
+        elif v < best[pos]:
+            best[pos] = v
+            known = pos + 1
+        elif v > best[pos]:
+            return -1
+        return v
+
+    def fill_rows(grid, r):
+        """ Choose the source rows for the rows r, r+1, ... of the form, the columns are already chosen """
+        nonlocal next_label, best_transform
+        if r == n:
+            best_transform = (grid is not state, list(rows), list(cols), list(relabel))
+            return
+
+        if r % b == 0:
+            used_bands = [row // b for row in rows]
+            choices = [row for row in range(n) if not ((row // b) in used_bands)]
+        else:
+            band = rows[-1] // b
+            choices = [row for row in range(band * b, band * b + b) if not (row in rows)]
+
+        tried = []
+        for row in choices:
+            # equal rows (of equal bands) are swapped by a symmetry of the board, so they give the same forms
+            if row_keys[row] in tried:
+                continue
+            tried.append(row_keys[row])
+            saved_label = next_label
+            src = grid[row]
+            pos = r * n
+            worse = False
+            for c in cols:
+                if put(pos, src[c]) == -1:
+                    worse = True
+                    break
+                pos += 1
+            if not worse:
+                rows.append(row)
+                fill_rows(grid, r + 1)
+                rows.pop()
+            # forget the values, renumbered in this row
+            for v in range(1, n + 1):
+                if relabel[v] > saved_label - 1:
+                    relabel[v] = 0
+            next_label = saved_label
+
+    def fill_first_row(grid, src, c):
+        """ Choose the source columns for the columns c, c+1, ... of the first row of the form """
+        nonlocal next_label
+        if c == n:
+            fill_rows(grid, 1)
+            return
+
+        if c % b == 0:
+            used_stacks = [col // b for col in cols]
+            choices = [col for col in range(n) if not ((col // b) in used_stacks)]
+        else:
+            stack = cols[-1] // b
+            choices = [col for col in range(stack * b, stack * b + b) if not (col in cols)]
+
+        tried = []
+        for col in sorted(choices, key=lambda col: src[col] != 0):
+            if col_keys[col] in tried:
+                continue
+            tried.append(col_keys[col])
+            saved_label = next_label
+            if put(c, src[col]) != -1:
+                cols.append(col)
+                fill_first_row(grid, src, c + 1)
+                cols.pop()
+            if next_label != saved_label:
+                relabel[src[col]] = 0
+                next_label = saved_label
+
+    # the best second row of the form, its leading cells reached by the current best branch,
+    # and the (grid, first row, second row, column order) giving it
+    best_second = [0] * n
+    known_second = 0
+    candidates = []
+
+    def fill_second_row(grid, r0, r1):
+        """ Choose the source columns, making the second row of the form (from the row r1 of grid) minimal,
+        while the first one (from the row r0) keeps the empty cells of the top row.
+        The value of r1, seen in r0, gets the number of its column in r0, so its column is put to the first free
+        place, that its stack allows. The column orders, giving the best second row so far, go to candidates"""
+        src0 = grid[r0]
+        src1 = grid[r1]
+        zeros = [src0[stack * b:stack * b + b].count(0) for stack in range(b)]
+        where = [-1] * (n + 1)
+        for c in range(n):
+            if src0[c] != 0:
+                where[src0[c]] = c
+
+        # the column order of the form and the placed columns, the source stack of each stack of the form
+        # and the form stack of each source stack (-1 - not chosen yet), and the numbers of the values,
+        # which are not in the row r0. They are changed in place by the branches and restored after them
+        order = [-1] * n
+        pos = [-1] * n
+        form_stack = [-1] * b
+        src_stack = [-1] * b
+        labels = [0] * (n + 1)
+
+        def place(c, col):
+            """ Where the column of r0 with the value of the column col of r1 goes, if col is put to c:
+            (its column of the form, the form stack, its source stack gets), the form stack is -1,
+            if it is already placed. The column is not in the stack of col, so it is not at c"""
+            col0 = where[src1[col]]
+            if pos[col0] != -1:
+                return (pos[col0], -1)
+            sq = c // b
+            stack = col0 // b
+            sq0 = src_stack[stack]
+            if sq0 == -1:
+                for s in range(b):
+                    if form_stack[s] == -1 and s != sq and top[s] == zeros[stack]:
+                        sq0 = s
+                        break
+                new_stack = sq0
+            else:
+                new_stack = -1
+            for p in range(sq0 * b + top[sq0], sq0 * b + b):
+                if order[p] == -1 and p != c:
+                    return (p, new_stack)
+
+        def walk(c, next_new):
+            """ Choose the source column for the column c of the form, the columns of the values
+            of the second row before c are already placed. The value, each choice puts to c, is computed
+            before anything is changed, and only the choices giving the minimal value are walked further """
+            nonlocal known_second
+            if c == n:
+                candidates.append((grid, r0, r1, list(order)))
+                return
+
+            sq = c // b
+            if order[c] != -1:
+                choices = [order[c]]
+            else:
+                if form_stack[sq] != -1:
+                    stacks = [form_stack[sq]]
+                else:
+                    stacks = [stack for stack in range(b) if src_stack[stack] == -1 and zeros[stack] == top[sq]]
+                empty = c % b < top[sq]
+                choices = []
+                tried = []
+                for stack in stacks:
+                    for col in range(stack * b, stack * b + b):
+                        if pos[col] == -1 and (src0[col] == 0) == empty and not (col_keys[col] in tried):
+                            tried.append(col_keys[col])
+                            choices.append(col)
+
+            vals = []
+            for col in choices:
+                v = src1[col]
+                if v == 0:
+                    vals.append(0)
+                elif where[v] == -1:
+                    vals.append(labels[v] if labels[v] != 0 else next_new)
+                else:
+                    vals.append(first_labels[place(c, col)[0]])
+
+            val = min(vals)
+            if c >= known_second:
+                best_second[c] = val
+                known_second = c + 1
+            elif val < best_second[c]:
+                best_second[c] = val
+                known_second = c + 1
+                # the column orders found before give a greater second row
+                del candidates[:]
+            elif val > best_second[c]:
+                return
+
+            for i in range(len(choices)):
+                if vals[i] != val:
+                    continue
+                col = choices[i]
+                placed = order[c] == col
+                new_form_stack = not placed and form_stack[sq] == -1
+                if not placed:
+                    order[c] = col
+                    pos[col] = c
+                    if new_form_stack:
+                        form_stack[sq] = col // b
+                        src_stack[col // b] = sq
+                v = src1[col]
+                new_label = v != 0 and where[v] == -1 and labels[v] == 0
+                p = -1
+                if new_label:
+                    labels[v] = next_new
+                elif v != 0 and where[v] != -1:
+                    (p, sq0) = place(c, col)
+                    if pos[where[v]] != -1:
+                        p = -1
+                    else:
+                        col0 = where[v]
+                        if sq0 != -1:
+                            form_stack[sq0] = col0 // b
+                            src_stack[col0 // b] = sq0
+                        order[p] = col0
+                        pos[col0] = p
+
+                walk(c + 1, next_new + 1 if new_label else next_new)
+
+                if p != -1:
+                    pos[order[p]] = -1
+                    order[p] = -1
+                    if sq0 != -1:
+                        src_stack[form_stack[sq0]] = -1
+                        form_stack[sq0] = -1
+                if new_label:
+                    labels[v] = 0
+                if not placed:
+                    if new_form_stack:
+                        src_stack[col // b] = -1
+                        form_stack[sq] = -1
+                    order[c] = -1
+                    pos[col] = -1
+
+        walk(0, n - src0.count(0) + 1)
+
+    def line_keys(grid):
+        """ Keys of the rows of the grid: the row itself and the rows of its band (in any order) """
+        band_keys = [sorted(grid[band * b:band * b + b]) for band in range(b)]
+        return [(grid[row], band_keys[row // b]) for row in range(n)]
+
+    def leading_zeros(line):
+        """ Maximum number of empty cells at the start of the line, with the stacks and columns reordered """
+        zeros = [line[stack * b:stack * b + b].count(0) for stack in range(b)]
+        full = zeros.count(b) * b
+        rest = [z for z in zeros if z != b]
+        return full + (max(rest) if len(rest) > 0 else 0)
+
+    def stack_zeros(line):
+        """ Numbers of the empty cells in the stacks of the line, the most first.
+        The larger list gives the smaller first row of the form (all the empty cells of a stack go first) """
+        return sorted([line[stack * b:stack * b + b].count(0) for stack in range(b)], reverse=True)
+
+    def has_repeats(line):
+        values = [v for v in line if v != 0]
+        return len(set(values)) != len(values)
+
+    transposed = [[state[r][c] for r in range(n)] for c in range(n)]
+    grids = [state] if transposed == state else [state, transposed]
+    keys = [(line_keys(grid), line_keys([[grid[r][c] for r in range(n)] for c in range(n)])) for grid in grids]
+
+    if b == 1 or any(has_repeats(line) for line in state + transposed):
+        # the renumbered first row depends on the values here, so the column orders are walked one by one:
+        # only the rows with the most leading empty cells can be the first row of the form
+        max_leading = max(leading_zeros(row) for row in state + transposed)
+        for (grid, (row_keys, col_keys)) in zip(grids, keys):
+            tried = []
+            for row in range(n):
+                if row_keys[row] in tried or leading_zeros(grid[row]) < max_leading:
+                    continue
+                tried.append(row_keys[row])
+                rows.append(row)
+                fill_first_row(grid, grid[row], 0)
+                rows.pop()
+    else:
+        top = max(stack_zeros(row) for row in state + transposed)
+        # renumbered values of the first row of the form
+        first_labels = []
+        label = 0
+        for c in range(n):
+            if c % b < top[c // b]:
+                first_labels.append(0)
+            else:
+                label += 1
+                first_labels.append(label)
+        for (grid, (row_keys, col_keys)) in zip(grids, keys):
+            tried = []
+            for r0 in range(n):
+                if row_keys[r0] in tried or stack_zeros(grid[r0]) != top:
+                    continue
+                tried.append(row_keys[r0])
+                band = r0 // b
+                tried_second = []
+                for r1 in range(band * b, band * b + b):
+                    if r1 == r0 or row_keys[r1] in tried_second:
+                        continue
+                    tried_second.append(row_keys[r1])
+                    fill_second_row(grid, r0, r1)
+
+        for (grid, r0, r1, order) in candidates:
+            row_keys = keys[0][0] if grid is state else keys[1][0]
+            for v in range(n + 1):
+                relabel[v] = 0
+            next_label = 1
+            rows[:] = [r0, r1]
+            cols[:] = order
+            worse = False
+            for c in range(2 * n):
+                if put(c, grid[rows[c // n]][cols[c % n]]) == -1:
+                    worse = True
+                    break
+            if worse:
+                continue
+
+            if top[0] != 0:
+                fill_rows(grid, 2)
+                continue
+
+            # all values are numbered by the first row of a full grid, and they differ in each column,
+            # so the rest rows of the band and the other bands go in the order of their first cells
+            first_cell = lambda row: relabel[grid[row][cols[0]]]
+            band = r0 // b
+            rows.extend(sorted([row for row in range(band * b, band * b + b) if not (row in (r0, r1))], key=first_cell))
+            bands = [sorted(range(other * b, other * b + b), key=first_cell) for other in range(b) if other != band]
+            for band_rows in sorted(bands, key=lambda band_rows: first_cell(band_rows[0])):
+                rows.extend(band_rows)
+            for c in range(2 * n, cells):
+                if put(c, grid[rows[c // n]][cols[c % n]]) == -1:
+                    worse = True
+                    break
+            if not worse:
+                best_transform = (grid is not state, list(rows), list(cols), list(relabel))
+
+    form = [best[r * n:(r + 1) * n] for r in range(n)]
+    return (form, best_transform)
+
+def apply_transform(state, transform):
+    """ Apply the transform (transposed, rows, columns, renumbering), as returned by canonical_form, to the board:
+    cell (r, c) of the result is the renumbered value of the cell (rows[r], columns[c]) of the (transposed) board"""
+    (transposed, rows, cols, relabel) = transform
+    if transposed:
+        state = [[state[r][c] for r in range(len(state))] for c in range(len(state))]
+
+    return [[relabel[state[r][c]] for c in cols] for r in rows]
+
+
+class SolutionCountCache:
+    """ Bounded LRU cache of the numbers of solutions of boards, shared by Sudoku instances
+    (the module-level solution_count_cache is the default one).
+    Boards are keyed by pack_state, with canonical=True by pack_state of their canonical_form,
+    so all equivalent boards share one entry. Numbers are stored with the limit, they were counted with.
+    canonical=True slows the lookups down: canonical_form takes milliseconds (tens for sparse or symmetric boards),
+    more than many of the uniqueness checks of the generators, which are cached. So it is off by default
+    and for the generators; the key of the last board is reused, so get and put of the same board
+    (as in memo_nsolutions) take one canonical_form"""
+
+    def __init__(self, maxsize=100000, canonical=False):
+        """ Initialize the empty cache, keeping at most maxsize boards """
+        self.maxsize = maxsize
+        self.canonical = canonical
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (pack_state of the board, its key) for the last board with canonical=True
+        self.last_key = (None, None)
+
+    def key(self, state):
+        packed = pack_state(state)
+        if not self.canonical:
+            return packed
+        if self.last_key[0] != packed:
+            self.last_key = (packed, pack_state(canonical_form(state)[0]))
+        return self.last_key[1]
+
+    def get(self, state, limit=2):
+        """ Number of solutions of the board up to limit (as returned by count_solutions(limit)),
+        None, if it isn't known"""
+        key = self.key(state)
+        entry = self.entries.get(key)
+        if entry is not None:
+            (count, counted_limit) = entry
+            # count below its limit is exact, otherwise it is only known to be at least counted_limit
+            if count < counted_limit or limit <= counted_limit:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return min(count, limit)
+
+        self.misses += 1
+        return None
+
+    def put(self, state, limit, count):
+        """ Remember the number of solutions of the board, counted up to limit """
+        key = self.key(state)
+        self.entries[key] = (count, limit)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """ Forget all boards, the counters are reset too """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+solution_count_cache = SolutionCountCache()
+
+
+class SolverStats:
+    """ Counters of the searches, collected by solve_board(..., stats=SolverStats()).
+    The counters are added up over the solves, until reset is called.
+    They are counted by StatsSudoku, the propagation and the search without stats don't check for them"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # values tried for the cells, values failed at once, the deepest level of the search
+        self.nodes = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.update_calls = 0
+        # values removed from the cells: from the peers of the set cells ("naked_singles"),
+        # and by the tricks of do_tricks
+        self.eliminations = {"naked_singles": 0, "hidden_singles": 0, "pointing": 0, "naked_subsets": 0}
+        # seconds in try_simple_solution and in the search after it
+        self.init_time = 0.0
+        self.search_time = 0.0
+        self.solves = 0
+
+    def as_dict(self):
+        return {"nodes": self.nodes, "backtracks": self.backtracks, "max_depth": self.max_depth,
+                "update_calls": self.update_calls, "eliminations": dict(self.eliminations),
+                "init_time": self.init_time, "search_time": self.search_time, "solves": self.solves}
+
+    def __str__(self):
+        return ("solves {0}, nodes {1}, backtracks {2}, max depth {3}, update_possibilities calls {4}, "
+                "eliminations {5}, try_simple_solution {6:.4f}s, search {7:.4f}s").format(
+            self.solves, self.nodes, self.backtracks, self.max_depth, self.update_calls,
+            ", ".join("{0} {1}".format(k, v) for (k, v) in self.eliminations.items()),
+            self.init_time, self.search_time)
+
+
 class Sudoku:
-    """ Class for 9x9 Sudoku board manipulation (standard rules) """
+    """ Class for 9x9 Sudoku board manipulation (standard rules).
+    Boards of other sizes n x n (n is a square: 4, 16, 25, ...) are supported by the "incremental" engine """
+
+    def __init__(self, init_state=None, n=None):
+        """ Initialize Sudoku board, the size is taken from init_state, or n (9 by default) for the empty board"""
+        if n is None:
+            n = 9 if init_state == None else len(init_state)
+        if n < 4 or isqrt(n) ** 2 != n:
+            my_error = ValueError("{0} is not a valid Sudoku board size!".format(n))
+            raise my_error
+        self.n = n
 
-    def __init__(self, init_state=None):
-        """ Initialize Sudoku board """
         # By default fill the board with 0, which will denote empty cell
         if init_state == None:
             self.clear()
         else:
             # check for wrong values in the provided init_state, and raise an exception, if they are
+            if len(init_state) != n:
+                my_error = ValueError("The board should have {0} rows!".format(n))
+                raise my_error
             for row in init_state:
+                if len(row) != n:
+                    my_error = ValueError("The board should have {0} columns!".format(n))
+                    raise my_error
                 for cell in row:
-                    if not (cell in range(10)):
+                    if not (cell in range(n + 1)):
                         my_error = ValueError("{0} is not a valid Sudoku cell content!".format(cell))
                         raise my_error
 
@@ -181,11 +1148,18 @@ class Sudoku:
         rng = random.Random()
         self.rnd_seed = rng.randrange(1000000000)
 
+        # numbers of solutions of the boards, tried by the generators, are shared by all instances
+        self.count_cache = solution_count_cache
+        self.tried_boards = set()
+
+        # counts of the values in the units, kept by assign (see track), for the board self.tracked_state
+        self.tracked_state = None
+
     def clear(self):
         """ Clear sudoku board (this means, fill it with empty cells)"""
         self.state = []
-        for i in range(9):
-            self.state.append([0] * 9)
+        for i in range(self.n):
+            self.state.append([0] * self.n)
 
     def my_rng(self):
         """ Pseudo-random number generator, return current RNG state"""
@@ -219,7 +1193,7 @@ class Sudoku:
 
     def given_cells_count(self):
         """ Count given cells on board, denoted by 1-9s """
-        return 81 - self.empty_cells_count()
+        return self.n * self.n - self.empty_cells_count()
 
     def __str__(self):
         """ Represent the current board as text"""
@@ -228,72 +1202,149 @@ class Sudoku:
     def cell_get_possibilities(self, row, col):
         """ Get the list of possible values for the cell """
 
-        res = set(range(1, 10))
-        # check for conflicting values in the row
-        for i in range(9):
-            if i != col:
-                if self.state[row][i] != 0 and (self.state[row][i] in res):
-                    res.remove(self.state[row][i])
-
-        # check for conflicting values in the column
-        for i in range(9):
-            if i != row:
-                if self.state[i][col] != 0 and (self.state[i][col] in res):
-                    res.remove(self.state[i][col])
-                    if len(res) == 0:
-                        return list(res)
-
-        # check for conflicting values in the 3x3 square
-        sq_row = row // 3
-        sq_col = col // 3
-        for r in range(sq_row * 3, sq_row * 3 + 3):
-            for c in range(sq_col * 3, sq_col * 3 + 3):
-                if not (r == row and c == col):
-                    if self.state[r][c] != 0 and (self.state[r][c] in res):
-                        res.remove(self.state[r][c])
-                        if len(res) == 0:
-                            return list(res)
+        n = self.n
+        res = set(range(1, n + 1))
+        # check for conflicting values in the row, column and 3x3 square
+        for p in unit_tables(n)[2][row * n + col]:
+            v = self.state[p // n][p % n]
+            if v != 0 and (v in res):
+                res.remove(v)
+                if len(res) == 0:
+                    return list(res)
 
         return list(res)
 
     def cell_has_no_conflicts(self, row, col):
         """ Check if the value in a given cell has no conflicts with the values of other cells """
-        if self.state[row][col] == 0:
+        v = self.state[row][col]
+        if v == 0:
             return True
 
-        # check for conflicting values in the row
-        for i in range(9):
-            if i != col:
-                if self.state[row][i] == self.state[row][col]:
-                    return False
-
-        # check for conflicting values in the column
-        for i in range(9):
-            if i != row:
-                if self.state[i][col] == self.state[row][col]:
-                    return False
-
-        # check for conflicting values in the 3x3 square
-        sq_row = row // 3
-        sq_col = col // 3
-        for r in range(sq_row * 3, sq_row * 3 + 3):
-            for c in range(sq_col * 3, sq_col * 3 + 3):
-                if not (r == row and c == col):
-                    if self.state[r][c] == self.state[row][col]:
-                        return False
+        # check for conflicting values in the row, column and 3x3 square
+        n = self.n
+        for p in unit_tables(n)[2][row * n + col]:
+            if self.state[p // n][p % n] == v:
+                return False
 
         return True
 
     def board_has_no_conflicts(self):
         """ Check if the whole board has no conflicts """
-        for r in range(9):
-            for c in range(9):
+        for r in range(self.n):
+            for c in range(self.n):
                 if not self.cell_has_no_conflicts(r, c):
                     return False
 
         return True
 
+    def track(self):
+        """ Count the values in each unit of the current board, for assign and the *_tracked queries.
+        They call it themselves (see check_tracked), when self.state is replaced by another board,
+        call it after changing the board in place not by assign"""
+        n = self.n
+        # unit_counts[u * n + v - 1] - how many times the value v is in the unit u,
+        # unit_masks[u] - bits of the values in the unit, duplicates - extra copies of the values in the units
+        self.unit_counts = [0] * (3 * n * n)
+        self.unit_masks = [0] * (3 * n)
+        self.duplicates = 0
+        self.nempty = 0
+        self.tracked_state = self.state
+        for r in range(n):
+            for c in range(n):
+                if self.state[r][c] == 0:
+                    self.nempty += 1
+                else:
+                    self.track_value(r * n + c, self.state[r][c], 1)
+
+    def track_value(self, idx, v, delta):
+        """ Add (delta=1) or remove (delta=-1) the value v of the cell idx in the counts of its units """
+        n = self.n
+        counts = self.unit_counts
+        bit = 1 << (v - 1)
+        for u in unit_tables(n)[1][idx]:
+            k = u * n + v - 1
+            cnt = counts[k]
+            if delta > 0:
+                if cnt > 0:
+                    self.duplicates += 1
+                else:
+                    self.unit_masks[u] = self.unit_masks[u] | bit
+            elif cnt > 1:
+                self.duplicates -= 1
+            else:
+                self.unit_masks[u] = self.unit_masks[u] & ~bit
+            counts[k] = cnt + delta
+
+    def check_tracked(self):
+        """ Count the values again, if the board was replaced since the counting"""
+        if self.tracked_state is not self.state:
+            self.track()
+
+    def assign(self, row, col, v):
+        """ Set the cell to the value v (0 - empty), updating the counts of the values in its units"""
+        self.check_tracked()
+        old_value = self.state[row][col]
+        if old_value == v:
+            return
+        idx = row * self.n + col
+        if old_value == 0:
+            self.nempty -= 1
+        else:
+            self.track_value(idx, old_value, -1)
+        if v == 0:
+            self.nempty += 1
+        else:
+            self.track_value(idx, v, 1)
+        self.state[row][col] = v
+
+    def empty_cells_count_tracked(self):
+        """ Same as empty_cells_count, using the counts, kept by assign """
+        self.check_tracked()
+        return self.nempty
+
+    def cell_has_no_conflicts_tracked(self, row, col):
+        """ Same as cell_has_no_conflicts, using the counts, kept by assign """
+        self.check_tracked()
+        v = self.state[row][col]
+        if v == 0:
+            return True
+        n = self.n
+        for u in unit_tables(n)[1][row * n + col]:
+            if self.unit_counts[u * n + v - 1] > 1:
+                return False
+
+        return True
+
+    def board_has_no_conflicts_tracked(self):
+        """ Same as board_has_no_conflicts, using the counts, kept by assign """
+        self.check_tracked()
+        return self.duplicates == 0
+
+    def cell_get_possibilities_tracked(self, row, col):
+        """ Same as cell_get_possibilities, using the values of the units, kept by assign """
+        self.check_tracked()
+        n = self.n
+        if self.state[row][col] != 0:
+            # the value of the cell itself is counted in its units
+            return self.cell_get_possibilities(row, col)
+        (u0, u1, u2) = unit_tables(n)[1][row * n + col]
+        m = ((1 << n) - 1) & ~(self.unit_masks[u0] | self.unit_masks[u1] | self.unit_masks[u2])
+        if n == 9:
+            return list(bits2list_cache[m])
+        return [v + 1 for v in range(n) if (m >> v) & 1]
+
     def do_tricks(self, poss):
+        """ Apply hidden singles, naked pairs/triplets and pointing to poss until nothing changes.
+        Return false if we met conflicts. The tricks are written for 9x9 boards only"""
+        if self.n != 9:
+            my_error = ValueError("The tricks work on 9x9 boards only, not {0}x{0}".format(self.n))
+            raise my_error
+        return self.apply_tricks(poss, poss, poss, poss)
+
+    def apply_tricks(self, poss, singles, subsets, pointing):
+        """ Same as do_tricks, but the cells, changed by hidden singles, naked pairs/triplets and pointing,
+        are written to singles, subsets and pointing. These are poss itself,
+        or the views of it, counting the removed values (see StatsSudoku)"""
         # check, if we have only one cell, were value is possible in a row, column, or 3x3 square
         # check for "one in row"
         while True:
@@ -312,8 +1363,9 @@ class Sudoku:
                     curval_pos = bits2list_cache[value_positions[val]]
                     if len(curval_pos) == 1:
                         cur = curval_pos[0] - 1
-                        if bits2list_cache_l[poss[row * 9 + cur]] != 1:
-                            poss[row * 9 + cur] = 1 << val
+                        idx = row * 9 + cur
+                        if bits2list_cache_l[poss[idx]] != 1:
+                            singles[idx] = 1 << val
                             update_list.append((row, cur))
                     elif len(curval_pos) == 0:
                         return False
@@ -323,10 +1375,12 @@ class Sudoku:
                     return False
 
                 for np in npt:
-                    np_mask = ~vals[np[0]]
+                    np_bits = vals[np[0]]
                     for i in range(9):
                         if not (i in np):
-                            poss[row * 9 + i] = poss[row * 9 + i] & np_mask
+                            idx = row * 9 + i
+                            if (poss[idx] & np_bits) != 0:
+                                subsets[idx] = poss[idx] & ~np_bits
 
                     if is_same_sq(np):
                         sq_row = row // 3
@@ -334,7 +1388,9 @@ class Sudoku:
                         for r in range(sq_row * 3, sq_row * 3 + 3):
                             for c in range(sq_col *3, sq_col *3 + 3):
                                 if r != row:
-                                    poss[r * 9 + c] = poss[r * 9 + c] & np_mask
+                                    idx = r * 9 + c
+                                    if (poss[idx] & np_bits) != 0:
+                                        subsets[idx] = poss[idx] & ~np_bits
 
             # check for "one in column"
             for col in range(9):
@@ -351,8 +1407,9 @@ class Sudoku:
                     curval_pos = bits2list_cache[value_positions[val]]
                     if len(curval_pos) == 1:
                         cur = curval_pos[0] - 1
-                        if bits2list_cache_l[poss[cur * 9 + col]] != 1:
-                            poss[cur * 9 + col] = 1 << val
+                        idx = cur * 9 + col
+                        if bits2list_cache_l[poss[idx]] != 1:
+                            singles[idx] = 1 << val
                             update_list.append((cur, col))
                     elif len(curval_pos) == 0:
                         return False
@@ -362,10 +1419,12 @@ class Sudoku:
                     return False
 
                 for np in npt:
-                    np_mask = ~vals[np[0]]
+                    np_bits = vals[np[0]]
                     for i in range(9):
                         if not (i in np):
-                            poss[i * 9 + col] = poss[i * 9 + col] & np_mask
+                            idx = i * 9 + col
+                            if (poss[idx] & np_bits) != 0:
+                                subsets[idx] = poss[idx] & ~np_bits
 
                     if is_same_sq(np):
                         sq_row = np[0] // 3
@@ -373,7 +1432,9 @@ class Sudoku:
                         for r in range(sq_row * 3, sq_row * 3 + 3):
                             for c in range(sq_col *3, sq_col *3 + 3):
                                 if c != col:
-                                    poss[r * 9 + c] = poss[r * 9 + c] & np_mask
+                                    idx = r * 9 + c
+                                    if (poss[idx] & np_bits) != 0:
+                                        subsets[idx] = poss[idx] & ~np_bits
 
             # check for one in 3x3 square
             for sq_row in range(3):
@@ -394,8 +1455,9 @@ class Sudoku:
                             cur = curval_pos[0] - 1
                             r = sq_row * 3 + cur // 3
                             c = sq_col * 3 + cur % 3
-                            if bits2list_cache_l[poss[r * 9 + c]] != 1:
-                                poss[r * 9 + c] = 1 << val
+                            idx = r * 9 + c
+                            if bits2list_cache_l[poss[idx]] != 1:
+                                singles[idx] = 1 << val
                                 update_list.append((r, c))
                         elif len(curval_pos) == 0:
                             return False
@@ -410,7 +1472,7 @@ class Sudoku:
                                     if c // 3 != sq_col:
                                         idx = r * 9 + c
                                         if (poss[idx] & val_bit) != 0:
-                                            poss[idx] = poss[idx] & val_mask
+                                            pointing[idx] = poss[idx] & val_mask
                                             l = bits2list_cache_l[poss[idx]]
                                             if l == 0:
                                                 return False
@@ -422,7 +1484,7 @@ class Sudoku:
                                     if r // 3 != sq_row:
                                         idx = r * 9 + c
                                         if (poss[idx] & val_bit) != 0:
-                                            poss[idx] = poss[idx] & val_mask
+                                            pointing[idx] = poss[idx] & val_mask
                                             l = bits2list_cache_l[poss[idx]]
                                             if l == 0:
                                                 return False
@@ -434,12 +1496,12 @@ class Sudoku:
                         return False
 
                     for np in npt:
-                        np_mask = ~vals[np[0]]
+                        np_bits = vals[np[0]]
                         for i in range(9):
                             if not (i in np):
-                                r = sq_row * 3 + i // 3
-                                c = sq_col * 3 + i % 3
-                                poss[r * 9 + c] = poss[r * 9 + c] & np_mask
+                                idx = (sq_row * 3 + i // 3) * 9 + sq_col * 3 + i % 3
+                                if (poss[idx] & np_bits) != 0:
+                                    subsets[idx] = poss[idx] & ~np_bits
 
             if len(update_list) == 0:
                 return True
@@ -456,7 +1518,7 @@ class Sudoku:
 
     def update_possibilities(self, poss, row, col, tricks):
         """ Update sets of possible values, after setting the cell at row and col.
-        Return true if all updates were successful, and false if we met conflicts."""
+        Return true if all updates were successful, and false if we met conflicts"""
         cur_val_bit = poss[row * 9 + col]
         cur_val_mask = ~cur_val_bit
 
@@ -508,13 +1570,39 @@ class Sudoku:
                 return False
 
         if tricks:
-            if not self.do_tricks(poss):
+            if not self.apply_tricks(poss, poss, poss, poss):
                 return False
 
         return True
 
 
+    def update_possibilities_kernel(self, poss, row, col, tricks):
+        """ Drop-in replacement for update_possibilities, using the table-driven propagation kernel"""
+        idx = row * 9 + col
+        return propagate_incremental(poss, [idx], list(UNITS_OF[idx]), tricks, None)
+
+    def try_simple_solution_incremental(self, tricks = True):
+        """ Same as try_simple_solution, using the event-driven propagation (for boards of any size)"""
+        n = self.n
+        possibilities = [(1 << n) - 1] * (n * n)
+        singles = []
+        for r in range(n):
+            for c in range(n):
+                if self.state[r][c] != 0:
+                    possibilities[r * n + c] = 1 << (self.state[r][c] - 1)
+                    singles.append(r * n + c)
+
+        if not propagate_incremental(possibilities, singles, list(range(3 * n)), tricks, None, n):
+            return None
+
+        return possibilities
+
     def try_simple_solution(self,tricks = True):
+        """ Initial possibilities of the 9x9 board for the "classic" engine (try_simple_solution_incremental
+        is the one for boards of any size)"""
+        if self.n != 9:
+            my_error = ValueError("The classic propagation works on 9x9 boards only, not {0}x{0}".format(self.n))
+            raise my_error
         possibilities = [511] * 81
         for r in range(9):
             for c in range(9):
@@ -533,12 +1621,53 @@ class Sudoku:
 
         return possibilities
 
-    def solve_board(self, shuffle_idx=True, shuffle_possibilities=True, nsolutions=1, tricks=True):
-        """ Find solution(s) for the board"""
+    def solve_board(self, shuffle_idx=True, shuffle_possibilities=True, nsolutions=1, tricks=True,
+                    engine="classic", stats=None):
+        """ Find solution(s) for the board.
+        engine selects the search: "classic" (backtracking, copying the possibilities list for each value),
+        "kernel" (the classic backtracking with the table-driven propagation kernel),
+        "incremental" (count_possibilities: backtracking in a SearchScratch with the trail and the kernel's
+        event-driven propagation, randomized in another way than "classic", see search_order)
+        "dlx" (Algorithm X over dancing links, tricks are not used),
+        "backjump" (conflict-directed backjumping with nogoods, no faster than the others, see solve_board_backjump)
+        or "sat" (CDCL SAT solver over the candidates, see solve_board_sat).
+        Boards of other sizes than 9x9 are solved by the "incremental", "backjump" or "sat" engine.
+        With stats (a SolverStats object) the counters of the "classic" search are added to it"""
+
+        engine = self.size_engine(engine)
+        if stats is not None:
+            if engine != "classic":
+                my_error = ValueError("Statistics are collected by the classic engine only, not {0}".format(engine))
+                raise my_error
+            stats.solves += 1
+            t0 = time.perf_counter()
+        if engine == "dlx":
+            return self.solve_board_dlx(shuffle_idx, shuffle_possibilities, nsolutions)
+        elif engine == "backjump":
+            return self.solve_board_backjump(shuffle_idx, shuffle_possibilities, nsolutions, tricks)
+        elif engine == "sat":
+            return self.solve_board_sat(shuffle_idx, shuffle_possibilities, nsolutions, tricks)
+        elif engine == "incremental":
+            solutions = []
+            if self.board_has_no_conflicts():
+                poss = self.try_simple_solution_incremental(tricks)
+                if poss is not None:
+                    order, rng = self.search_order(shuffle_idx, shuffle_possibilities)
+                    count_possibilities(poss, nsolutions, tricks, array("i"), solutions, self.n, None, None, order, rng)
+
+            return [poss2list(solution) for solution in solutions]
+        elif engine == "kernel":
+            init_possibilities = self.try_simple_solution_incremental
+            update_possibilities = self.update_possibilities_kernel
+        elif engine == "classic":
+            init_possibilities = self.try_simple_solution
+            update_possibilities = self.update_possibilities
+        else:
+            my_error = ValueError("{0} is not a valid solver engine!".format(engine))
+            raise my_error
 
         def try_cell(n, poss):
             """ Resursively walk the empty cells and try different values """
-
             #skip cells with 1 possibility
             for i in range(n, len(empty_idx)):
                 r = empty_idx[i] // 9
@@ -591,7 +1720,7 @@ class Sudoku:
                 poss_bak = list(poss)
                 poss[r * 9 + c] = 1 << (i-1)
 
-                if not self.update_possibilities(poss, r, c, tricks):
+                if not update_possibilities(poss, r, c, tricks):
                     poss = poss_bak
                     continue
 
@@ -605,7 +1734,13 @@ class Sudoku:
                 if len(res) >= nsolutions:
                     break
 
-        #t0 = time.time()
+        if stats is not None:
+            # the counting variants of the propagation and the search, the default ones have no counters
+            counting = StatsSudoku(self, stats)
+            init_possibilities = counting.try_simple_solution
+            update_possibilities = counting.try_value
+            try_cell = counting.search(try_cell)
+
         # initialize the list of results
         res = []
 
@@ -625,8 +1760,11 @@ class Sudoku:
             res.append(copy_state(self.state))
             return res
 
-        possibilities = self.try_simple_solution(tricks)
-        #t1 = time.time()
+        possibilities = init_possibilities(tricks)
+        if stats is not None:
+            t1 = time.perf_counter()
+            stats.init_time += t1 - t0
+            t0 = t1
 
         if possibilities is None:
             return res
@@ -649,40 +1787,755 @@ class Sudoku:
             self.my_shuffle(empty_idx)
 
         try_cell(0, possibilities)
-        #t2 = time.time()
-        #print("Time to complete try_simple_solution {0}, to complete all {1}.".format(t1-t0,t2-t0))
+        if stats is not None:
+            stats.search_time += time.perf_counter() - t0
+        return res
+
+    def size_engine(self, engine):
+        """ The engine to use for the board: the other engines rely on 9x9 tables,
+        so boards of other sizes are solved by the size-parametric "incremental" engine"""
+        if self.n != 9 and engine in ("classic", "kernel", "incremental", "dlx"):
+            return "incremental"
+
+        return engine
+
+    def search_order(self, shuffle_idx=False, shuffle_possibilities=False):
+        """ The order of cells and the value chooser (rng) for search_possibilities on this board:
+        the cells are shuffled, if shuffle_idx, and the values are drawn with my_rng_range,
+        if shuffle_possibilities. The random numbers are drawn in another way than in the "classic" engine,
+        so a seeded randomized search finds other solutions than "classic" with the same seed"""
+        order = list(range(self.n * self.n))
+        if shuffle_idx:
+            self.my_shuffle(order)
+
+        return order, (self.my_rng_range if shuffle_possibilities else None)
+
+    def iter_solutions(self, shuffle_idx=False, shuffle_possibilities=False, tricks=True):
+        """ Generate solutions of the board one by one, as soon as they are found.
+        This is search_possibilities (the "incremental" engine): an explicit stack in a SearchScratch
+        instead of recursion, the event-driven propagation, and changes of possibilities are rolled back
+        with a trail instead of copying them,
+        so the caller could stop at any moment and memory doesn't grow with the number of solutions.
+        The same solutions are found as by solve_board with other engines, but not always in the same order,
+        see search_order for the randomized search"""
+        # can't solve the board, that already has conflicts
+        if not self.board_has_no_conflicts():
+            return
+
+        poss = self.try_simple_solution_incremental(tricks)
+        if poss is None:
+            return
+
+        order, rng = self.search_order(shuffle_idx, shuffle_possibilities)
+        for solution in search_possibilities(poss, tricks, array("i"), self.n, None, order, rng):
+            yield poss2list(solution)
+
+    def count_solutions(self, limit=2, tricks=True, engine="incremental"):
+        """ Count solutions of the board, stopping as soon as limit solutions are found.
+        Solutions are only counted: they are neither copied nor randomized.
+        "dlx" and "incremental" (count_possibilities) engines have dedicated counting searches,
+        other engines are used through solve_board.
+        The default "incremental" engine is the fastest one on the unique boards.
+        The number of solutions doesn't depend on the engine"""
+        engine = self.size_engine(engine)
+        if engine == "dlx":
+            return self.solve_board_dlx(False, False, limit, True)
+        elif engine != "incremental":
+            return len(self.solve_board(False, False, limit, tricks, engine))
+
+        # can't solve the board, that already has conflicts
+        if not self.board_has_no_conflicts():
+            return 0
+
+        poss = self.try_simple_solution_incremental(tricks)
+        if poss is None:
+            return 0
+
+        return count_possibilities(poss, limit, tricks, array("i"), None, self.n)
+
+    def is_unique(self, tricks=True, engine="incremental"):
+        """ Check if the board has exactly one solution """
+        return self.count_solutions(2, tricks, engine) == 1
+
+    def is_unique_solution(self, solution, cells=None, tricks=True, poss=None, scratch=None):
+        """ Check if solution (a filled board, which is a solution of this board) is its only solution.
+        Only a different solution is looked for: the reference value is forbidden in one empty cell at a time,
+        and the cells tried before are fixed to their reference values, so the searches are disjoint,
+        and the first counterexample stops them.
+        If the board with the cells (indices row * n + col) filled from solution is known to have
+        the only solution, other solutions could differ from it only in these cells, and only they are tried:
+        after removing one cell from the unique board a single search is enough.
+        poss are the propagated possibilities of the board, if they are already known (as kept by
+        generate_board_annealing), the probes start from them, and they are restored on return.
+        The searches run in scratch (a SearchScratch for the size of the board, a new one if it is None)"""
+        n = self.n
+        units_of = unit_tables(n)[1]
+        if poss is None:
+            poss = self.try_simple_solution_incremental(tricks)
+            if poss is None:
+                return False
+        if scratch is None:
+            scratch = SearchScratch(n)
+
+        if cells is None:
+            cells = [r * n + c for r in range(n) for c in range(n) if self.state[r][c] == 0]
+
+        trail = array("i")
+        unique = True
+        for idx in cells:
+            bit = 1 << (solution[idx // n][idx % n] - 1)
+            if poss[idx] == bit:
+                continue
+
+            # look for a solution with another value in this cell
+            mark = len(trail)
+            trail.append(idx)
+            trail.append(poss[idx])
+            poss[idx] = poss[idx] & ~bit
+            singles = [idx] if (poss[idx] & (poss[idx] - 1)) == 0 else []
+            if propagate_incremental(poss, singles, list(units_of[idx]), tricks, trail, n):
+                if count_possibilities(poss, 1, tricks, trail, None, n, None, scratch) > 0:
+                    unique = False
+                    break
+            undo_trail(poss, trail, mark)
+
+            # the other solutions should have the reference value here
+            trail.append(idx)
+            trail.append(poss[idx])
+            poss[idx] = bit
+            if not propagate_incremental(poss, [idx], list(units_of[idx]), tricks, trail, n):
+                # there are no solutions with the reference values in these cells
+                break
+
+        undo_trail(poss, trail, 0)
+        return unique
+
+
+    def removable_clues(self, solution, candidates=None, tricks=False, scratch=None):
+        """ Find the given cells, which could be removed (one at a time) keeping the only solution.
+        The board should have the only solution, solution.
+        candidates are indices (row * n + col) of the given cells to test, all given cells by default.
+        The snapshot is built once: the board without the candidates is propagated,
+        and then the values of the candidates are removed from their peers.
+        Each removal is tested against it: the removed value comes back to the peers, which don't see it
+        in another unit, and only a solution with another value in the removed cell is looked for
+        (see is_unique_solution). The fewer candidates, the more propagation is shared by the probes.
+        The searches run in scratch (a SearchScratch for the size of the board, a new one if it is None).
+        Return the set of the removable ones"""
+        n = self.n
+        if scratch is None:
+            scratch = SearchScratch(n)
+        (units, units_of, peers, box_segments) = unit_tables(n)
+        all_values = (1 << n) - 1
+        if candidates is None:
+            candidates = [r * n + c for r in range(n) for c in range(n) if self.state[r][c] != 0]
+        values = [(idx, 1 << (solution[idx // n][idx % n] - 1)) for idx in candidates]
+
+        # the board without the candidates, propagated
+        core = [all_values] * (n * n)
+        singles = []
+        for idx in range(n * n):
+            v = self.state[idx // n][idx % n]
+            if v != 0:
+                core[idx] = 1 << (v - 1)
+                singles.append(idx)
+        for (idx, bit) in values:
+            core[idx] = all_values
+            singles.remove(idx)
+        trail = array("i")
+        # the board has a solution, so the smaller one can't have conflicts
+        propagate_incremental(core, singles, list(range(3 * n)) if tricks else [], tricks, trail, n)
+
+        # the snapshot: the candidates are put back, their values are removed from the peers
+        unit_values = [0] * (3 * n)
+        base = list(core)
+        for (idx, bit) in values:
+            base[idx] = bit
+            for u in units_of[idx]:
+                unit_values[u] = unit_values[u] | bit
+            for p in peers[idx]:
+                base[p] = base[p] & ~bit
+        # the cells, which became single, and the units to examine with tricks
+        base_singles = [p for p in range(n * n) if base[p] != core[p] and (base[p] & (base[p] - 1)) == 0]
+        base_dirty = sorted(set(u for p in range(n * n) if base[p] != core[p] for u in units_of[p]))
+
+        res = set()
+        for (idx, bit) in values:
+            my_units = units_of[idx]
+            (u0, u1, u2) = my_units
+            # the other values, possible in the cell: its own value is still in its units
+            m = core[idx] & ~(unit_values[u0] | unit_values[u1] | unit_values[u2])
+            if m == 0:
+                res.add(idx)
+                continue
+
+            poss = list(base)
+            poss[idx] = m
+            for p in peers[idx]:
+                if (core[p] & bit) != 0 and self.state[p // n][p % n] == 0:
+                    seen = 0
+                    for u in units_of[p]:
+                        if not (u in my_units):
+                            seen = seen | unit_values[u]
+                    if (seen & bit) == 0:
+                        poss[p] = poss[p] | bit
+            singles = [p for p in base_singles if (poss[p] & (poss[p] - 1)) == 0]
+            if (m & (m - 1)) == 0:
+                singles.append(idx)
+
+            del trail[:]
+            dirty = list(base_dirty) if tricks else []
+            if not propagate_incremental(poss, singles, dirty, tricks, trail, n):
+                res.add(idx)
+            elif count_possibilities(poss, 1, tricks, trail, None, n, None, scratch) == 0:
+                res.add(idx)
+
+        return res
+
+    def solve_board_dlx(self, shuffle_idx=True, shuffle_possibilities=True, nsolutions=1, count_only=False):
+        """ Find solution(s) for the board, using Algorithm X over the dancing links
+        exact cover matrix of the 324 cell/row/column/3x3 square constraints.
+        shuffle_idx randomizes the choice between equally constrained columns,
+        shuffle_possibilities randomizes the order of values tried for a column.
+        With count_only solutions are not copied, and their number is returned instead of the list"""
+        res = []
+        count = 0
+
+        # can't solve the board, that already has conflicts
+        if not self.board_has_no_conflicts():
+            if count_only:
+                return count
+            return res
+
+        left = list(dlx_left)
+        right = list(dlx_right)
+        up = list(dlx_up)
+        down = list(dlx_down)
+        col = dlx_col
+        size = [9] * DLX_FIRST_NODE
+
+        # link column headers into the root list, the order is used to break ties while choosing a column
+        headers = list(range(1, DLX_FIRST_NODE))
+        if shuffle_idx:
+            self.my_shuffle(headers)
+        prev = DLX_ROOT
+        for h in headers:
+            right[prev] = h
+            left[h] = prev
+            prev = h
+        right[prev] = DLX_ROOT
+        left[DLX_ROOT] = prev
+
+        def cover(c):
+            """ Remove column c from the header list, and all rows of c from the other columns"""
+            right[left[c]] = right[c]
+            left[right[c]] = left[c]
+            i = down[c]
+            while i != c:
+                j = right[i]
+                while j != i:
+                    down[up[j]] = down[j]
+                    up[down[j]] = up[j]
+                    size[col[j]] -= 1
+                    j = right[j]
+                i = down[i]
+
+        def uncover(c):
+            """ Undo cover(c), restoring links in the reverse order"""
+            i = up[c]
+            while i != c:
+                j = left[i]
+                while j != i:
+                    size[col[j]] += 1
+                    down[up[j]] = j
+                    up[down[j]] = j
+                    j = left[j]
+                i = up[i]
+            right[left[c]] = c
+            left[right[c]] = c
+
+        # put the given cells to the partial solution
+        for r in range(9):
+            for c in range(9):
+                if self.state[r][c] != 0:
+                    node = DLX_FIRST_NODE + ((r * 9 + c) * 9 + self.state[r][c] - 1) * 4
+                    for j in range(node, node + 4):
+                        cover(col[j])
+
+        chosen = []
+
+        def search():
+            """ Recursively choose the column with the fewest rows and try each of its rows """
+            nonlocal count
+            if right[DLX_ROOT] == DLX_ROOT:
+                count += 1
+                if not count_only:
+                    solution = copy_state(self.state)
+                    for node in chosen:
+                        row = (node - DLX_FIRST_NODE) // 4
+                        solution[row // 81][(row // 9) % 9] = row % 9 + 1
+                    res.append(solution)
+                return
+
+            # look for the column with minimum rows
+            best = DLX_ROOT
+            best_size = 10
+            h = right[DLX_ROOT]
+            while h != DLX_ROOT:
+                if size[h] < best_size:
+                    best = h
+                    best_size = size[h]
+                    if best_size <= 1:
+                        break
+                h = right[h]
+
+            if best_size == 0:
+                return
+
+            cover(best)
+
+            rows = []
+            i = down[best]
+            while i != best:
+                rows.append(i)
+                i = down[i]
+
+            if shuffle_possibilities:
+                self.my_shuffle(rows)
+
+            for i in rows:
+                chosen.append(i)
+                j = right[i]
+                while j != i:
+                    cover(col[j])
+                    j = right[j]
+
+                search()
+
+                j = left[i]
+                while j != i:
+                    uncover(col[j])
+                    j = left[j]
+                chosen.pop()
+
+                #exit, if we have found enough solutions
+                if count >= nsolutions:
+                    break
+
+            uncover(best)
+
+        search()
+        if count_only:
+            return count
+        return res
+
+    def solve_board_backjump(self, shuffle_idx=True, shuffle_possibilities=True, nsolutions=1, tricks=True,
+                             backjump=True, max_nogoods=0):
+        """ Find solution(s) for the board with conflict-directed backjumping (for boards of any size).
+        Each removed value remembers the decision levels behind its removal (a bitmask of levels),
+        a dead end yields the levels behind it, and the search jumps back straight to the deepest of them,
+        skipping the levels, which had nothing to do with the conflict.
+        With max_nogoods > 0 the assignments of an exhausted level's conflict set are kept as a nogood
+        (at most max_nogoods of them, the oldest are forgotten), and a nogood,
+        that holds again under other upper-level assignments, is a conflict (or removes the last value) at once.
+        Tricks are limited to "only one in unit", which has a simple explanation.
+        With backjump=False this is the same search with chronological backtracking and no nogoods.
+        Counters of the last search are kept in self.backjump_stats.
+        This is not a speedup. With tricks (as the generators search) no level is skipped on field_hard and field_19.
+        Without tricks 19 and 75 levels are skipped, saving 0.3% and 8% of the nodes, and the nogoods cost
+        more time than they save (see sudoku_bench.bench_backjump)"""
+        n = self.n
+        (units, units_of, peers, box_segments) = unit_tables(n)
+        all_values = (1 << n) - 1
+        res = []
+        stats = {"nodes": 0, "backjumps": 0, "levels_skipped": 0, "nogoods_learned": 0, "nogood_prunings": 0}
+        self.backjump_stats = stats
+
+        # can't solve the board, that already has conflicts
+        if not self.board_has_no_conflicts():
+            return res
+
+        poss = [all_values] * (n * n)
+        # levels behind the removal of value v from the cell idx, at idx * n + v - 1,
+        # meaningful only while the value is removed
+        reasons = [0] * (n * n * n)
+        # flat list of (cell, old possibilities) pairs
+        trail = []
+
+        # nogoods are tuples of (cell, bit) assignments, watched by each of their assignments
+        nogoods = {}
+        nogood_order = deque()
+        watches = {}
+        next_nogood = 0
+
+        def cell_reason(p, m):
+            """ Levels behind the removal of all values of the cell p, except the ones in m"""
+            reason = 0
+            removed = all_values & ~m
+            base = p * n - 1
+            while removed != 0:
+                bit = removed & -removed
+                reason = reason | reasons[base + bit.bit_length()]
+                removed = removed ^ bit
+            return reason
+
+        def remove(p, bits, reason, singles, dirty):
+            """ Remove bits from possibilities of the cell p because of reason levels.
+            Return the conflict levels, if the cell has no values left, otherwise None"""
+            m = poss[p]
+            trail.append(p)
+            trail.append(m)
+            bits = bits & m
+            m = m & ~bits
+            poss[p] = m
+            base = p * n - 1
+            while bits != 0:
+                bit = bits & -bits
+                reasons[base + bit.bit_length()] = reason
+                bits = bits ^ bit
+            if (m & (m - 1)) == 0:
+                if m == 0:
+                    return cell_reason(p, 0)
+                singles.append(p)
+            if tricks:
+                for u in units_of[p]:
+                    if not (u in dirty):
+                        dirty.append(u)
+            return None
+
+        def check_nogoods(p, singles, dirty):
+            """ Check nogoods, watching the value of the newly single cell p.
+            Return the conflict levels, if one of them holds completely, otherwise None"""
+            watching = watches.get((p, poss[p]))
+            if watching is None:
+                return None
+            # forgotten nogoods are dropped from the watch lists lazily
+            watching[:] = [k for k in watching if k in nogoods]
+            for k in watching:
+                holds = True
+                unassigned = None
+                for (c, bit) in nogoods[k]:
+                    if poss[c] != bit:
+                        if (poss[c] & bit) != 0 and unassigned is None:
+                            unassigned = (c, bit)
+                        else:
+                            # this nogood can't hold now, or it holds only partially
+                            holds = False
+                            break
+                if not holds:
+                    continue
+                reason = 0
+                for (c, bit) in nogoods[k]:
+                    if poss[c] == bit:
+                        reason = reason | cell_reason(c, bit)
+                if unassigned is None:
+                    return reason
+                stats["nogood_prunings"] += 1
+                conflict = remove(unassigned[0], unassigned[1], reason, singles, dirty)
+                if conflict is not None:
+                    return conflict
+            return None
+
+        def propagate(singles, dirty):
+            """ Propagate the single cells and "only one in unit" until nothing changes.
+            Return the conflict levels, if we met a dead end, otherwise None"""
+            while True:
+                while len(singles) > 0:
+                    p = singles.pop()
+                    bit = poss[p]
+                    reason = cell_reason(p, bit)
+                    for q in peers[p]:
+                        if (poss[q] & bit) != 0:
+                            conflict = remove(q, bit, reason, singles, dirty)
+                            if conflict is not None:
+                                return conflict
+                    if len(nogoods) > 0:
+                        conflict = check_nogoods(p, singles, dirty)
+                        if conflict is not None:
+                            return conflict
+
+                if len(dirty) == 0:
+                    return None
+
+                cells = units[dirty.pop()]
+                once = 0
+                twice = 0
+                for p in cells:
+                    m = poss[p]
+                    twice = twice | (once & m)
+                    once = once | m
+                if once != all_values:
+                    # some value has no place in the unit
+                    bit = all_values & ~once
+                    bit = bit & -bit
+                    v = bit.bit_length() - 1
+                    reason = 0
+                    for q in cells:
+                        reason = reason | reasons[q * n + v]
+                    return reason
+
+                only = once & ~twice
+                if only != 0:
+                    for p in cells:
+                        h = poss[p] & only
+                        if h != 0 and h != poss[p]:
+                            # the value was removed from the other cells of the unit
+                            bit = h & -h
+                            v = bit.bit_length() - 1
+                            reason = 0
+                            for q in cells:
+                                if q != p:
+                                    reason = reason | reasons[q * n + v]
+                            if h != bit:
+                                # the only place for two values
+                                bit = h ^ bit
+                                bit = bit & -bit
+                                v = bit.bit_length() - 1
+                                for q in cells:
+                                    if q != p:
+                                        reason = reason | reasons[q * n + v]
+                                return reason
+                            conflict = remove(p, poss[p] & ~h, reason, singles, dirty)
+                            if conflict is not None:
+                                return conflict
+
+        def undo(mark):
+            while len(trail) > mark:
+                old = trail.pop()
+                poss[trail.pop()] = old
+
+        # the given cells are decisions of level 0, they never take part in conflicts
+        singles = []
+        for r in range(n):
+            for c in range(n):
+                if self.state[r][c] != 0:
+                    poss[r * n + c] = 1 << (self.state[r][c] - 1)
+                    singles.append(r * n + c)
+        if propagate(singles, list(range(3 * n)) if tricks else []) is not None:
+            return res
+
+        order = list(range(n * n))
+        if shuffle_idx:
+            self.my_shuffle(order)
+
+        # frames of the search, one for each level (level = position in the stack + 1):
+        # [cell index, values to try, next value number, trail mark, conflict levels]
+        stack = []
+        while True:
+            # look for the cell with minimum possibilities
+            best = -1
+            best_l = n + 1
+            for idx in order:
+                l = poss[idx].bit_count()
+                if l < best_l and l != 1:
+                    best = idx
+                    best_l = l
+                    if l <= 2:
+                        break
+
+            if best == -1:
+                res.append(poss2list(poss))
+                if len(res) >= nsolutions or len(stack) == 0:
+                    return res
+                # look for the other solutions chronologically: every level is behind this "dead end"
+                stack[-1][4] = stack[-1][4] | ((1 << len(stack)) - 2)
+            else:
+                values = bits2list(poss[best])
+                if shuffle_possibilities:
+                    self.my_shuffle(values)
+                # the values, removed before choosing the cell, are the first reasons of its failure
+                stack.append([best, values, 0, len(trail), cell_reason(best, poss[best])])
+
+            # try the next value for the innermost level, jump back, if all values were tried
+            descend = False
+            while len(stack) > 0 and not descend:
+                level = len(stack)
+                frame = stack[-1]
+                (idx, values, k, mark, conflict) = frame
+                undo(mark)
+                if k == len(values):
+                    if not backjump:
+                        conflict = (1 << level) - 2
+                    if conflict == 0:
+                        # the dead end doesn't depend on any decision
+                        return res
+
+                    target = conflict.bit_length() - 1
+                    if backjump and max_nogoods > 0:
+                        nogood = tuple((stack[l - 1][0], poss[stack[l - 1][0]]) for l in range(1, target + 1)
+                                       if (conflict >> l) & 1)
+                        nogoods[next_nogood] = nogood
+                        nogood_order.append(next_nogood)
+                        for literal in nogood:
+                            watches.setdefault(literal, []).append(next_nogood)
+                        next_nogood += 1
+                        stats["nogoods_learned"] += 1
+                        if len(nogood_order) > max_nogoods:
+                            del nogoods[nogood_order.popleft()]
+
+                    if target < level - 1:
+                        stats["backjumps"] += 1
+                        stats["levels_skipped"] += level - 1 - target
+                    undo(stack[target][3])
+                    del stack[target:]
+                    stack[-1][4] = stack[-1][4] | (conflict & ~(1 << target))
+                    continue
+
+                frame[2] = k + 1
+                stats["nodes"] += 1
+                bit = 1 << (values[k] - 1)
+                trail.append(idx)
+                trail.append(poss[idx])
+                removed = poss[idx] & ~bit
+                poss[idx] = bit
+                # the other values of the cell are removed by the decision of this level
+                base = idx * n - 1
+                while removed != 0:
+                    b = removed & -removed
+                    reasons[base + b.bit_length()] = 1 << level
+                    removed = removed ^ b
+                conflict = propagate([idx], list(units_of[idx]) if tricks else [])
+                if conflict is None:
+                    descend = True
+                else:
+                    frame[4] = frame[4] | (conflict & ~(1 << level))
+
+            if not descend:
+                return res
+
+    def solve_board_sat(self, shuffle_idx=True, shuffle_possibilities=True, nsolutions=1, tricks=True):
+        """ Find solution(s) for the board with the CDCL SAT solver (for boards of any size).
+        The candidates left by the propagation kernel are the variables (one for each cell and value),
+        the clauses say, that each cell has exactly one value, and each value is exactly once in each
+        row, column and square. Learned clauses keep the search from walking into the same dead end again.
+        Further solutions are searched for after adding a clause, which forbids the found ones.
+        shuffle_idx and shuffle_possibilities randomize the initial order of decisions.
+        Counters of the last search are kept in self.sat_stats"""
+        n = self.n
+        units = unit_tables(n)[0]
+        res = []
+        self.sat_stats = {"variables": 0, "clauses": 0, "conflicts": 0, "decisions": 0, "restarts": 0}
+
+        # can't solve the board, that already has conflicts
+        if not self.board_has_no_conflicts():
+            return res
+
+        poss = self.try_simple_solution_incremental(tricks)
+        if poss is None:
+            return res
+
+        if is_solved(poss):
+            res.append(poss2list(poss))
+            return res
+
+        # one variable for each candidate of the cells, which are not solved yet
+        var_of = {}
+        candidates = []
+        for idx in range(n * n):
+            m = poss[idx]
+            if (m & (m - 1)) != 0:
+                for v in bits2list(m):
+                    candidates.append((idx, v))
+                    var_of[idx * n + v - 1] = len(candidates)
+
+        solver = SatSolver(len(candidates))
+
+        def exactly_one(variables):
+            solver.add_clause(variables)
+            for i in range(len(variables)):
+                for j in range(i + 1, len(variables)):
+                    solver.add_clause([-variables[i], -variables[j]])
+
+        for idx in range(n * n):
+            m = poss[idx]
+            if (m & (m - 1)) != 0:
+                exactly_one([var_of[idx * n + v - 1] for v in bits2list(m)])
+
+        for cells in units:
+            placed = 0
+            for p in cells:
+                if (poss[p] & (poss[p] - 1)) == 0:
+                    placed = placed | poss[p]
+            for v in bits2list(((1 << n) - 1) & ~placed):
+                exactly_one([var_of[p * n + v - 1] for p in cells if (p * n + v - 1) in var_of])
+
+        self.sat_stats["variables"] = len(candidates)
+        self.sat_stats["clauses"] = len(solver.clauses)
+
+        # try to put the values first, in the (randomized) order of the candidates
+        order = list(range(1, len(candidates) + 1))
+        if shuffle_idx or shuffle_possibilities:
+            self.my_shuffle(order)
+        for (k, var) in enumerate(order):
+            solver.phase[var] = True
+            solver.activity[var] = (len(order) - k) * 1e-6
+
+        while len(res) < nsolutions and solver.solve():
+            solution = poss2list(poss)
+            chosen = []
+            for var in range(1, len(candidates) + 1):
+                if solver.model[var]:
+                    (idx, v) = candidates[var - 1]
+                    solution[idx // n][idx % n] = v
+                    chosen.append(-var)
+            res.append(solution)
+            # forbid this solution
+            solver.add_clause(chosen)
+
+        self.sat_stats["conflicts"] = solver.conflicts
+        self.sat_stats["decisions"] = solver.decisions
+        self.sat_stats["restarts"] = solver.restarts
         return res
 
     def clear_issolvable_cache(self):
-        """Clear cache of number of solutions"""
-        self.issolvable = {}
-
-    def memo_nsolutions(self):
-        """Calculate the number of solutions for the current board (up to 2).
-        Uses self.issolvable dictionary to cache results"""
-        k = tuple(tuple(row) for row in self.state)
-        nsol = self.issolvable.get(k)
+        """Forget the boards tried by the current generation (numbers of solutions stay in self.count_cache)"""
+        self.tried_boards = set()
+
+    def memo_nsolutions(self, solution=None, cells=None, unique=None):
+        """Calculate the number of solutions for the current board (up to 2), using self.count_cache.
+        If the solution of the board is known, only a different one is looked for
+        by is_unique_solution(solution, cells). If the uniqueness is already known
+        (e.g. from removable_clues), it is only recorded. Return the number of solutions with the flag,
+        if the board was already tried since clear_issolvable_cache"""
+        key = pack_state(self.state)
+        tried = key in self.tried_boards
+        self.tried_boards.add(key)
+
+        if unique is not None:
+            nsol = 1 if unique else 2
+            self.count_cache.put(self.state, 2, nsol)
+            return (nsol, tried)
+
+        nsol = self.count_cache.get(self.state, 2)
         if nsol is None:
-            solutions = self.solve_board(False, False, 2)
-            nsol = len(solutions)
-            self.issolvable[k] = nsol
-        else:
-            return (nsol, True)
+            if solution is None:
+                nsol = self.count_solutions(2)
+            else:
+                # the probes are short searches, the tricks don't pay off there
+                nsol = 1 if self.is_unique_solution(solution, cells, False) else 2
+            self.count_cache.put(self.state, 2, nsol)
 
-        return (nsol, False)
+        return (nsol, tried)
 
     def generate_board_recursive(self, ncells_leave=40, max_solve_calls=10000,
-                                 fast_remove=0, full_search_thresh = 25):
+                                 fast_remove=0, full_search_thresh = 25, deadline=None):
         """
         Generate a board with one solution, by removing cells one by one from the current board.
-        Current board should have no empty cells
+        Current board should have no empty cells.
+        The generation gives up at deadline (time.perf_counter() value), if it is set
         """
+        size = self.n
+        ncells = size * size
         solve_calls = 0
         res = None
 
-        def remove_cell(n, cells_idx):
-            """ Remove the cell at index n of the list """
-            nonlocal res
+        def remove_cell(n, cells_idx, removable=None):
+            """ Remove the cell at index n of the list. removable is True (False), if the board stays unique
+            (not unique) without the cell, None if it wasn't probed yet"""
+            nonlocal res, solve_calls
+            if deadline is not None and time.perf_counter() > deadline:
+                # out of time: stop, as if all the solve calls were made
+                solve_calls = max_solve_calls + 1
             # make a local copy of cells_idx
             cells_idx = list(cells_idx)
             #shuffle cells_idx for cells, not yet being tried to remove
@@ -693,14 +2546,14 @@ class Sudoku:
             cache_hit = False
             if n>-1:
                 # decode index
-                r = cells_idx[n] // 9
-                c = cells_idx[n] % 9
+                r = cells_idx[n] // size
+                c = cells_idx[n] % size
 
                 old_value = self.state[r][c]
                 self.state[r][c] = 0
-                (nsol, cache_hit) = self.memo_nsolutions()
-                nonlocal solve_calls
-                if not cache_hit:
+                # the board before the removal has the only solution, so another one should differ in this cell
+                (nsol, cache_hit) = self.memo_nsolutions(solution, [cells_idx[n]], removable)
+                if not cache_hit and removable is None:
                     solve_calls += 1
 
                 #if solve_calls > max_solve_calls:
@@ -708,7 +2561,7 @@ class Sudoku:
 
                 if nsol == 1:
                     # board generated
-                    if 80 - n == ncells_leave:
+                    if ncells - 1 - n == ncells_leave:
                         res = copy_state(self.state)
                         # cleanup
                         self.state[r][c] = old_value
@@ -726,12 +2579,12 @@ class Sudoku:
 
             # make few tries for the left cells
             recursion_depth = []
-            ntries = 80 - n
+            ntries = ncells - 1 - n
             full_search = False
 
             #print("|" * (ntries - ncells_leave))
 
-            if 80 - n <= full_search_thresh:
+            if ntries <= full_search_thresh:
                 full_search = True
 
             if full_search and cache_hit:
@@ -740,13 +2593,27 @@ class Sudoku:
                     self.state[r][c] = old_value
                 return n  # don't try with the same board twice
 
+            # the cells are tried in this order, they are probed against the current board in batches:
+            # all of them for the full search, a few at a time otherwise (the loop stops after 3 successes).
+            # A batch is one solve call, the batches don't depend on self.count_cache,
+            # which is shared by the generations, so the board is the same for the seed in any process
+            candidates = cells_idx[n + 1:]
+            batch_size = ntries if full_search else 4
+            removable = {}
             nsuccess = 0
             for i in range(ntries):
                 tmp = cells_idx[n + 1]
                 cells_idx[n + 1] = cells_idx[n + 1 + i]
                 cells_idx[n + 1 + i] = tmp
 
-                depth = remove_cell(n + 1, cells_idx)
+                if not (candidates[i] in removable):
+                    batch = candidates[i:i + batch_size]
+                    found = self.removable_clues(solution, batch)
+                    solve_calls += 1
+                    for cell in batch:
+                        removable[cell] = cell in found
+
+                depth = remove_cell(n + 1, cells_idx, removable[candidates[i]])
 
                 recursion_depth.append(depth)
                 if solve_calls > max_solve_calls or res is not None:
@@ -770,34 +2637,35 @@ class Sudoku:
             return max(recursion_depth)
 
         self.clear_issolvable_cache()
-        cells_idx = list(range(81))
-        if fast_remove > 0 and fast_remove <= (81 - ncells_leave):
+        solution = copy_state(self.state)
+        cells_idx = list(range(ncells))
+        if fast_remove > 0 and fast_remove <= (ncells - ncells_leave):
             success = False
             for i in range(100):
                 bak = copy_state(self.state)
 
                 self.my_shuffle(cells_idx)
                 for j in range(fast_remove):
-                    r = cells_idx[j] // 9
-                    c = cells_idx[j] % 9
+                    r = cells_idx[j] // size
+                    c = cells_idx[j] % size
                     self.state[r][c] = 0
 
-                solutions = self.solve_board(False, False, 2)
+                nsol = 1 if self.is_unique_solution(solution, cells_idx[:fast_remove], False) else 2
                 solve_calls += 1
                 self.state = bak
 
-                if solve_calls > max_solve_calls:
+                if solve_calls > max_solve_calls or (deadline is not None and time.perf_counter() > deadline):
                     return res
 
-                if len(solutions) == 1:
+                if nsol == 1:
                     success = True
                     break
 
             if success:
                 bak = copy_state(self.state)
                 for j in range(fast_remove):
-                    r = cells_idx[j] // 9
-                    c = cells_idx[j] % 9
+                    r = cells_idx[j] // size
+                    c = cells_idx[j] % size
                     self.state[r][c] = 0
 
                 remove_cell(fast_remove, cells_idx)
@@ -809,20 +2677,22 @@ class Sudoku:
             remove_cell(-1, cells_idx)
         return res
 
-    def find_key_cells(self, randomize = False):
-        """ Find cells which we couldn't solve using simple exclusion, and only one in... rule"""
-        poss = self.try_simple_solution()
-        cells_by_nposs = [[] for i in range(9)]
-        for r in range(9):
-            for c in range(9):
-                l = bits2list_cache_l[poss[r * 9 + c]]
-                if l > 1:
-                    cells_by_nposs[l-1].append(r * 9 + c)
+    def find_key_cells(self, randomize = False, poss = None):
+        """ Find cells which we couldn't solve using simple exclusion, and only one in... rule.
+        poss are the propagated possibilities of the board, if they are already known"""
+        size = self.n
+        if poss is None:
+            poss = self.try_simple_solution() if size == 9 else self.try_simple_solution_incremental()
+        cells_by_nposs = [[] for i in range(size)]
+        for idx in range(size * size):
+            l = poss[idx].bit_count()
+            if l > 1:
+                cells_by_nposs[l-1].append(idx)
 
         res = []
-        for i in range(8):
-            if len(cells_by_nposs[8-i]) > 0:
-                tmp = list(cells_by_nposs[8-i])
+        for i in range(size - 1):
+            if len(cells_by_nposs[size - 1 - i]) > 0:
+                tmp = list(cells_by_nposs[size - 1 - i])
                 if randomize:
                     self.my_shuffle(tmp)
 
@@ -831,21 +2701,26 @@ class Sudoku:
 
         return res
 
-    def generate_board_annealing(self, ncells_leave=40, max_rounds=10000, keep_solution=True):
+    def generate_board_annealing(self, ncells_leave=40, max_rounds=10000, keep_solution=True, deadline=None):
         """
         Generate a board with one solution, by removing cells one by one from the current board.
-        Current board could have empty cells
+        Current board could have empty cells.
+        The generation gives up at deadline (time.perf_counter() value), if it is set
         """
 
+        size = self.n
+        units_of = unit_tables(size)[1]
+        # the searches of the removal probes and of the uniqueness checks of the opened boards
+        scratch = SearchScratch(size)
         # backup copy of the current field
         src_board = copy_state(self.state)
 
         given_cells = set()
         empty_cells = set()
-        for r in range(9):
-            for c in range(9):
+        for r in range(size):
+            for c in range(size):
                 if self.state[r][c]>0:
-                    given_cells.add(r*9+c)
+                    given_cells.add(r*size+c)
 
         res = None
 
@@ -857,22 +2732,50 @@ class Sudoku:
             #couldn't complete the task
             return res
 
+        # the uniqueness is checked against the known solution of the current board,
+        # while the board has the only solution, removing a cell needs a search in that cell only
+        solutions = self.solve_board(False, False, 1)
+        if len(solutions) == 0:
+            return res
+        solution = solutions[0]
+        unique = self.is_unique_solution(solution, None, False)
+        # the board is the one left by the last pass of removals, so none of its cells could be removed
+        minimal = False
+
         for iter in range(max_rounds):
+            if deadline is not None and time.perf_counter() > deadline:
+                break
             #print("|" * (len(given_cells) - ncells_leave))
             #find cells, which we could remove
             given_cells_list = list(given_cells)
             self.my_shuffle(given_cells_list)
+            if minimal:
+                given_cells_list = []
 
             #try to remove the cells, until we reach the necessary amount of given cells,
-            #or we can't remove cells anymore
-            for cell in given_cells_list:
-                r = cell // 9
-                c = cell % 9
+            #or we can't remove cells anymore.
+            #a clue, which can't be removed, stays so after removing other clues, so for the unique board
+            #the cells are probed in one batch, and the rest of removable ones again after each removal
+            removable = None
+            candidates = given_cells
+            for (k, cell) in enumerate(given_cells_list):
+                if unique:
+                    if removable is None:
+                        removable = self.removable_clues(solution,
+                                                         [i for i in given_cells_list[k:] if i in candidates],
+                                                         False, scratch)
+                        candidates = removable
+                    if not (cell in removable):
+                        continue
+                r = cell // size
+                c = cell % size
                 old_value = self.state[r][c]
                 self.state[r][c] = 0
                 given_cells.remove(cell)
                 empty_cells.add(cell)
-                if len(self.solve_board(True, False, 2)) == 1:
+                if unique or self.is_unique_solution(solution, None, False):
+                    removable = None
+                    unique = True
                     #a board with required number of given cells successfully generated
                     if len(given_cells) == ncells_leave:
                         res = copy_state(self.state)
@@ -883,6 +2786,7 @@ class Sudoku:
                     self.state[r][c] = old_value
                     given_cells.add(cell)
                     empty_cells.remove(cell)
+            minimal = True
 
             # we have remote the cells we could, no try to remove random cell,
             #and "open" random positions, until the board is solvable again
@@ -893,19 +2797,24 @@ class Sudoku:
             given_cells_list = list(given_cells)
             self.my_shuffle(given_cells_list)
             cell_to_remove = given_cells_list[0]
-            r = cell_to_remove // 9
-            c = cell_to_remove % 9
+            r = cell_to_remove // size
+            c = cell_to_remove % size
             self.state[r][c] = 0
 
             success = False
 
             #if we can change the resulting solution, generate a new board,
             #but keep the values of given cells
+            new_solution = solution
             if not keep_solution:
                 new_solutions = self.solve_board(True, True, 1)
                 new_board = new_solutions[0]
+                new_solution = new_board
                 self.state[r][c] = new_board[r][c]
-                if len(self.solve_board(True, False, 2)) == 1:
+                if self.is_unique_solution(new_solution, None, False):
+                    solution = new_solution
+                    unique = True
+                    minimal = False
                     continue
             else:
                 # remove the selected cell from the given cells set
@@ -913,18 +2822,21 @@ class Sudoku:
                 # while the next steps
                 given_cells.remove(cell_to_remove)
 
-            #try open some cells, until the board is solvable again
+            #try open some cells, until the board is solvable again.
+            #the possibilities are propagated once, and then updated by each opened cell
             empty_cells_list = list(empty_cells)
+            poss = self.try_simple_solution_incremental()
+            trail = array("i")
 
             for cell in empty_cells_list:
-                key_cells = self.find_key_cells(True)
+                key_cells = self.find_key_cells(True, poss)
                 for i in key_cells:
                     if i in empty_cells: #could be False, if some cells were empty in the initial state
                         add_cell = i
                         break
 
-                r = add_cell // 9
-                c = add_cell % 9
+                r = add_cell // size
+                c = add_cell % size
                 if keep_solution:
                     self.state[r][c] = src_board[r][c]
                 else:
@@ -932,9 +2844,18 @@ class Sudoku:
                         self.state[r][c] = new_board[r][c]
                 empty_cells.remove(add_cell)
                 given_cells.add(add_cell)
-                # check if the board is solvable now
-                if len(self.solve_board(True, False, 2)) == 1:
+                if self.state[r][c] != 0 and poss[add_cell] != 1 << (self.state[r][c] - 1):
+                    poss[add_cell] = 1 << (self.state[r][c] - 1)
+                    del trail[:]
+                    if not propagate_incremental(poss, [add_cell], list(units_of[add_cell]), True, trail, size):
+                        # no solutions, opening more cells wouldn't help
+                        break
+                # check if the board is solvable now, the probes start from the maintained possibilities
+                if self.is_unique_solution(new_solution, None, False, poss, scratch):
                     success = True
+                    solution = new_solution
+                    unique = True
+                    minimal = False
                     break
 
             if keep_solution:
@@ -952,10 +2873,11 @@ class Sudoku:
         return res
 
     def generate_from_bottom(self, maxgiven=25):
+        size = self.n
         board_bak = copy_state(self.state)
         self.clear()
         gc = set()
-        ec = set(range(81))
+        ec = set(range(size * size))
         res = None
 
         def generate(given_cells, empty_cells):
@@ -968,14 +2890,14 @@ class Sudoku:
             rnd_iter = 1 + self.my_rng_range(3)
             for i in range(min(rnd_iter, len(key_cells))):
                 add_cell = key_cells[i]
-                r = add_cell // 9
-                c = add_cell % 9
+                r = add_cell // size
+                c = add_cell % size
 
                 self.state[r][c] = new_board[r][c]
                 empty_cells.remove(add_cell)
                 given_cells.add(add_cell)
 
-                l = len(self.solve_board(False, False, 2))
+                l = self.count_solutions(2)
                 if l == 1:
                     nonlocal res
                     res = copy_state(self.state)
@@ -1000,4 +2922,393 @@ class Sudoku:
         return res
 
 
-init_caches()
\ No newline at end of file
+class EliminationCounter:
+    """ View of the possibilities for apply_tricks: the cells are written to poss,
+    and the values, removed from them, are counted in eliminations[technique]"""
+
+    def __init__(self, poss, eliminations, technique):
+        self.poss = poss
+        self.eliminations = eliminations
+        self.technique = technique
+
+    def __setitem__(self, idx, value):
+        self.eliminations[self.technique] += (self.poss[idx] & ~value).bit_count()
+        self.poss[idx] = value
+
+
+class StatsSudoku(Sudoku):
+    """ The board of the classic search with stats (a SolverStats object): the same propagation as in Sudoku,
+    with the counters around it, so the default propagation and search have none (see solve_board)"""
+
+    def __init__(self, sud, stats):
+        Sudoku.__init__(self, sud.state)
+        self.stats = stats
+        self.depth = 0
+
+    def update_possibilities(self, poss, row, col, tricks):
+        """ Same as Sudoku.update_possibilities, counting the calls and the values removed from the peers of the cell.
+        The peers lose the value before anything else is changed, so the peers without it afterwards are counted"""
+        self.stats.update_calls += 1
+        idx = row * 9 + col
+        bit = poss[idx]
+        peers = [p for p in PEERS[idx] if poss[p] & bit]
+        res = Sudoku.update_possibilities(self, poss, row, col, tricks)
+        self.stats.eliminations["naked_singles"] += sum(1 for p in peers if not poss[p] & bit)
+        return res
+
+    def apply_tricks(self, poss, singles, subsets, pointing):
+        """ Same as Sudoku.apply_tricks, counting the values, removed by each technique"""
+        eliminations = self.stats.eliminations
+        return Sudoku.apply_tricks(self, poss, EliminationCounter(singles, eliminations, "hidden_singles"),
+                                   EliminationCounter(subsets, eliminations, "naked_subsets"),
+                                   EliminationCounter(pointing, eliminations, "pointing"))
+
+    def try_value(self, poss, row, col, tricks):
+        """ update_possibilities after setting a value in the search: counts the values tried and failed"""
+        self.stats.nodes += 1
+        if self.update_possibilities(poss, row, col, tricks):
+            return True
+
+        self.stats.backtracks += 1
+        return False
+
+    def search(self, try_cell):
+        """ try_cell of solve_board, counting the depth of the search """
+        def counted(n, poss):
+            self.depth += 1
+            if self.depth > self.stats.max_depth:
+                self.stats.max_depth = self.depth
+            try_cell(n, poss)
+            self.depth -= 1
+
+        return counted
+
+# cell values of the boards in buffers: ASCII digits, '.' or raw values 0..9, 255 for the other bytes
+BUFFER_CELLS = bytes(v if v <= 9 else v - 48 if 48 <= v <= 57 else 0 if v == 46 else 255 for v in range(256))
+# all units of the 9x9 board, examined first by search_buffer
+BUFFER_UNITS = tuple(range(27))
+
+
+def buffer2cells(buf):
+    """ Convert the 9x9 board in the buffer (81 bytes: ASCII digits and '.', or raw values 0..9)
+    to bytes of 81 cell values"""
+    cells = bytes(buf).translate(BUFFER_CELLS)
+    if len(cells) != 81 or 255 in cells:
+        my_error = ValueError("{0!r} is not a valid Sudoku board!".format(bytes(buf)))
+        raise my_error
+
+    return cells
+
+def search_buffer(buf, limit, out, tricks=True, scratch=None):
+    """ Count solutions of the 9x9 board in the buffer up to limit, with the event-driven propagation
+    on a flat possibilities list (the board is not converted to a matrix).
+    The first solution found is written to out (a writable buffer of 81 bytes, or None),
+    as ASCII digits, if the board is in ASCII, or as raw values otherwise.
+    The board is read in place and the search runs in scratch (a SearchScratch, a new one if it is None),
+    so a caller, which reuses its scratch for the boards, allocates nothing for them"""
+    if len(buf) != 81:
+        my_error = ValueError("{0!r} is not a valid Sudoku board!".format(bytes(buf)))
+        raise my_error
+
+    if scratch is None:
+        scratch = SearchScratch()
+    poss = scratch.poss
+    singles = scratch.singles
+    dirty = scratch.dirty
+    queued = scratch.queued
+    trail = scratch.trail
+    del singles[:]
+    for u in dirty:
+        queued[u] = False
+    del dirty[:]
+    del trail[:]
+    # OR of the bytes: at least 46 ('.'), if the board is in ASCII, at most 15 for raw values
+    fmt = 0
+    for idx in range(81):
+        b = buf[idx]
+        fmt |= b
+        v = BUFFER_CELLS[b]
+        if v == 0:
+            poss[idx] = 511
+        elif v == 255:
+            my_error = ValueError("{0!r} is not a valid Sudoku board!".format(bytes(buf)))
+            raise my_error
+        else:
+            poss[idx] = 1 << (v - 1)
+            singles.append(idx)
+
+    dirty.extend(BUFFER_UNITS)
+    if not propagate_incremental(poss, singles, dirty, tricks, trail, 9, queued):
+        return 0
+    del trail[:]
+
+    first = scratch.first if out is not None else None
+    count = count_possibilities(poss, limit, tricks, trail, None, 9, first, scratch)
+    if count > 0 and out is not None:
+        digit = 48 if fmt >= 46 else 0
+        for idx in range(81):
+            out[idx] = first[idx].bit_length() + digit
+
+    return count
+
+def solve_buffer(buf, out=None, tricks=True, scratch=None):
+    """ Solve the 9x9 board in the buffer (bytes, bytearray or memoryview of 81 ASCII digits and '.',
+    or raw values 0..9) without building Sudoku objects or matrices.
+    The solution is written to out (a writable buffer of at least 81 bytes), in the encoding of the board.
+    Return out, or new bytes with the solution, if out is None. Return None, if the board has no solution.
+    scratch is a SearchScratch, reused by the caller for its boards (see search_buffer)"""
+    res = bytearray(81) if out is None else out
+    if search_buffer(buf, 1, res, tricks, scratch) == 0:
+        return None
+
+    return bytes(res) if out is None else out
+
+def is_unique_buffer(buf, out=None, tricks=True, scratch=None):
+    """ Check if the 9x9 board in the buffer (as for solve_buffer) has exactly one solution.
+    The first solution found is written to out, if it is not None"""
+    return search_buffer(buf, 2, out, tricks, scratch) == 1
+
+
+def solve_chunk(lines, nsolutions=1, engine="classic"):
+    """ Solve the boards given as lines of 81 digits, return the solutions of each board as lines.
+    This is the unit of work for the worker processes of solve_many"""
+    res = []
+    sud = Sudoku()
+    for line in lines:
+        sud.state = sudoku_str2state(line)
+        solutions = sud.solve_board(False, False, nsolutions, True, engine)
+        res.append([sudoku_state2line(s) for s in solutions])
+
+    return res
+
+def solve_many(puzzles, workers=None, chunksize=64, nsolutions=1, engine="classic"):
+    """ Solve boards from the iterable puzzles (9x9 matrices or strings of 81 digits, '0' or '.'
+    for empty cells) in a pool of worker processes. Generate the list of solutions (9x9 matrices)
+    for each board, in the order of the input. Only a few chunks of chunksize boards
+    are in flight at a time, so the input could be read lazily from a large file.
+    workers=1 solves the boards in the current process"""
+
+    def chunks():
+        """ Split the input into lists of boards, converted to lines of 81 digits.
+        The boards are checked here, so a bad one is reported by the caller, not by a worker"""
+        chunk = []
+        for p in puzzles:
+            board = sudoku_str2state(p) if isinstance(p, str) else p
+            if len(board) != 9 or any(len(row) != 9 or not all(v in range(10) for v in row) for row in board):
+                my_error = ValueError("{0!r} is not a valid 9x9 Sudoku board!".format(p))
+                raise my_error
+            chunk.append(sudoku_state2line(board))
+            if len(chunk) == chunksize:
+                yield chunk
+                chunk = []
+        if len(chunk) > 0:
+            yield chunk
+
+    for chunk_solutions in map_chunks(solve_chunk, chunks(), workers, (nsolutions, engine)):
+        for solutions in chunk_solutions:
+            yield [sudoku_str2state(s) for s in solutions]
+
+def map_chunks(func, chunks, workers=None, args=()):
+    """ Generate func(chunk, *args) for each chunk from the iterable chunks, in the order of the chunks,
+    computing them in a pool of workers processes (all CPUs if it is None, the current process for 1).
+    Only a few chunks are in flight at a time, so chunks could be read lazily"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        for chunk in chunks:
+            yield func(chunk, *args)
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        max_pending = workers * 2
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(func, chunk, *args))
+            # wait for the oldest chunk, if there are enough chunks in flight
+            while len(pending) >= max_pending:
+                yield pending.popleft().result()
+
+        while len(pending) > 0:
+            yield pending.popleft().result()
+
+# default effort of generate_puzzle: rounds of generate_board_annealing (as the game makes its boards),
+# solve calls of generate_board_recursive
+GENERATE_LIMITS = {"annealing": 500, "recursive": 10000}
+
+def generate_timeout(timeout, ngiven, restarts=0):
+    """ Seconds, a worker gets for generate_puzzle with ngiven given cells, before it is taken for dead or hung
+    and replaced: timeout for 25 and more. The annealing takes several times longer for each given cell fewer,
+    while still making progress, so the time doubles for each of them, and for each of restarts (the workers
+    replaced since the last board was made): a slow board gets more time after each replacement,
+    instead of being killed again and again"""
+    return timeout * 2 ** (max(0, 25 - ngiven) + restarts)
+
+def task_seed(base_seed, index):
+    """ RNG seed (for Sudoku.rnd_seed) of the index-th task of generate_many, derived from base_seed.
+    Nearby indices get unrelated seeds. The seeds are below 2**31, as in the game, and odd:
+    the multiplicative RNG keeps the zero low bits of an even seed"""
+    x = (base_seed * 2654435761 + (index + 1) * 2246822519) % 2147483648
+    x = x ^ (x >> 15)
+    x = (x * 2654435761) % 2147483648
+    x = x ^ (x >> 13)
+    return x | 1
+
+def generate_puzzle(seed, ngiven, method="annealing", limit=None, timeout=None):
+    """ Generate a 9x9 board with ngiven given cells and the only solution, from the RNG seed only:
+    3x3 squares on the diagonal are filled with shuffled values, the rest is solved with randomization,
+    then the cells are removed by generate_board_annealing or generate_board_recursive (method),
+    with limit rounds or solve calls (GENERATE_LIMITS by default).
+    So "seed/ngiven" identifies the board, as the sudoku number in the game.
+    Return the board, or None if it wasn't generated within the limit or timeout seconds"""
+    if not (method in GENERATE_LIMITS):
+        my_error = ValueError("Unknown generation method {0!r}".format(method))
+        raise my_error
+    if limit is None:
+        limit = GENERATE_LIMITS[method]
+    deadline = None if timeout is None else time.perf_counter() + timeout
+
+    sud = Sudoku()
+    sud.rnd_seed = seed
+    squares = []
+    for i in range(3):
+        values = list(range(1, 10))
+        sud.my_shuffle(values)
+        squares.append(values)
+    for (k, values) in enumerate(squares):
+        for i in range(9):
+            sud.state[3 * k + i // 3][3 * k + i % 3] = values[i]
+    sud.state = copy_state(sud.solve_board(True, True, 1)[0])
+
+    if method == "annealing":
+        return sud.generate_board_annealing(ngiven, limit, False, deadline)
+    return sud.generate_board_recursive(ngiven, limit, 0, 25, deadline)
+
+def generate_many(count, ngiven, method="annealing", workers=None, base_seed=0, limit=None, timeout=None):
+    """ Generate count boards with ngiven given cells by generate_puzzle in a pool of workers processes
+    (all CPUs if it is None, the current process for 1). The seed of the i-th task is task_seed(base_seed, i).
+    Generate the triples (i, seed, board) as the tasks complete, board is None if the task failed.
+    With timeout each task gives up after timeout seconds, so a slow board doesn't hold its worker"""
+    if not (method in GENERATE_LIMITS):
+        my_error = ValueError("Unknown generation method {0!r}".format(method))
+        raise my_error
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        for i in range(count):
+            seed = task_seed(base_seed, i)
+            yield (i, seed, generate_puzzle(seed, ngiven, method, limit, timeout))
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        # only a few tasks are in flight, a new one is submitted for each finished task
+        tasks = iter(range(count))
+        pending = {}
+
+        def submit(n):
+            for i in islice(tasks, n):
+                seed = task_seed(base_seed, i)
+                pending[executor.submit(generate_puzzle, seed, ngiven, method, limit, timeout)] = (i, seed)
+
+        submit(workers * 2)
+        try:
+            while len(pending) > 0:
+                done = wait(pending, return_when=FIRST_COMPLETED)[0]
+                for future in sorted(done, key=lambda f: pending[f][0]):
+                    (i, seed) = pending.pop(future)
+                    submit(1)
+                    yield (i, seed, future.result())
+        finally:
+            # the caller stopped early: drop the tasks, which aren't started yet
+            for future in pending:
+                future.cancel()
+
+def solve_lines(lines, unique=False):
+    """ Solve the 9x9 boards, given as lines of 81 characters ('0' or '.' for empty cells).
+    Return the pair (answer, solve time in seconds) for each board. The answer is the solution line,
+    or "none", if there is no solution; with unique - "unique", "multiple" or "none".
+    "invalid" is the answer for a line, which is not a board. This is the unit of work for the command line"""
+    res = []
+    out = bytearray(81)
+    scratch = SearchScratch()
+    for line in lines:
+        t0 = time.perf_counter()
+        try:
+            buf = line.encode("ascii")
+            if unique:
+                answer = ("none", "unique", "multiple")[search_buffer(buf, 2, None, True, scratch)]
+            elif solve_buffer(buf, out, True, scratch) is None:
+                answer = "none"
+            else:
+                answer = out.decode("ascii")
+        except ValueError:
+            answer = "invalid"
+        res.append((answer, time.perf_counter() - t0))
+
+    return res
+
+def percentile(sorted_values, q):
+    """ q-th (0..100) percentile of the sorted list, by the nearest rank """
+    k = max(0, -(-len(sorted_values) * q // 100) - 1)
+    return sorted_values[min(k, len(sorted_values) - 1)]
+
+def main(argv=None):
+    """ Command line interface: python -m sudoku solve [--unique] [-j N] [FILE ...]
+    reads boards, one per line, from the files (or stdin) and writes an answer line for each of them,
+    in the order of the input. The throughput and latency summary is written to stderr"""
+    import argparse
+    import fileinput
+    import sys
+
+    parser = argparse.ArgumentParser(prog="python -m sudoku", description="Sudoku solver")
+    commands = parser.add_subparsers(dest="command", required=True)
+    solve = commands.add_parser("solve",
+                                help="solve boards given as lines of 81 characters, '0' or '.' for empty cells")
+    solve.add_argument("files", nargs="*", metavar="FILE", help="input files, stdin if none or '-'")
+    solve.add_argument("-u", "--unique", action="store_true",
+                       help="print \"unique\", \"multiple\" or \"none\" instead of the solution")
+    solve.add_argument("-j", "--workers", type=int, default=None,
+                       help="number of worker processes (all CPUs by default)")
+    solve.add_argument("--chunksize", type=int, default=256, help="number of boards sent to a worker at once")
+    args = parser.parse_args(argv)
+
+    def chunks():
+        """ Non-empty lines of the input, except # comments, in lists of chunksize lines"""
+        chunk = []
+        for line in fileinput.input(args.files):
+            line = line.strip()
+            if line == "" or line.startswith("#"):
+                continue
+            chunk.append(line)
+            if len(chunk) == args.chunksize:
+                yield chunk
+                chunk = []
+        if len(chunk) > 0:
+            yield chunk
+
+    t0 = time.perf_counter()
+    times = []
+    try:
+        for results in map_chunks(solve_lines, chunks(), args.workers, (args.unique,)):
+            sys.stdout.write("".join(answer + "\n" for (answer, t) in results))
+            times.extend(t for (answer, t) in results)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # the reader of the output has exited, drop the rest of the output silently
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    elapsed = time.perf_counter() - t0
+
+    times.sort()
+    if len(times) == 0:
+        print("no boards in the input", file=sys.stderr)
+        return
+    print("{0} boards in {1:.3f}s: {2:.1f} boards/s, latency p50 {3:.3f}ms, p99 {4:.3f}ms".format(
+        len(times), elapsed, len(times) / elapsed, 1000 * percentile(times, 50), 1000 * percentile(times, 99)),
+        file=sys.stderr)
+
+init_caches()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+""" Solve many 9x9 boards at once: propagation runs as NumPy operations over an (N, 81) array
+of bit-encoded sets of possible values, and only boards, that still need guessing,
+fall through to Sudoku.solve_board one by one"""
+import numpy as np
+
+import sudoku
+
+# status of each board, returned by solve_batch
+BATCH_UNSOLVABLE = 0  # the board has conflicts or no solutions
+BATCH_SOLVED = 1      # solved by propagation only (the solution is unique)
+BATCH_SEARCHED = 2    # solved with backtracking
+BATCH_MULTIPLE = 3    # more than one solution found (only with check_unique=True)
+
+ALL_VALUES = 511
+
+# number of possibilities and the value of a bit-encoded set, as lookup tables
+POPCOUNT = np.array(sudoku.bits2list_cache_l, dtype=np.uint8)
+SINGLE_VALUE = np.array([v[0] if len(v) == 1 else 0 for v in sudoku.bits2list_cache], dtype=np.uint8)
+
+
+def init_unit_tables():
+    """ Cell indices of 27 units (9 rows, 9 columns, 9 3x3 squares), and for each kind of unit
+    the inverse permutation, mapping the flattened (9 units x 9 cells) layout back to cell order"""
+    units = []
+    for r in range(9):
+        units.append([r * 9 + c for c in range(9)])
+    for c in range(9):
+        units.append([r * 9 + c for r in range(9)])
+    for sq in range(9):
+        units.append([((sq // 3) * 3 + i // 3) * 9 + (sq % 3) * 3 + i % 3 for i in range(9)])
+
+    units = np.array(units, dtype=np.intp)
+    inverse = []
+    for kind in range(3):
+        flat = units[kind * 9:(kind + 1) * 9].reshape(81)
+        inv = np.empty(81, dtype=np.intp)
+        inv[flat] = np.arange(81)
+        inverse.append(inv)
+
+    return units, inverse
+
+UNITS, UNITS_INVERSE = init_unit_tables()
+
+
+def units2cells(by_unit):
+    """ Combine (N, 27, 9) per-unit copies of the cells back into (N, 81),
+    intersecting the three copies of each cell (its row, column and 3x3 square)"""
+    n = by_unit.shape[0]
+    res = by_unit[:, 0:9, :].reshape(n, 81)[:, UNITS_INVERSE[0]]
+    for kind in (1, 2):
+        res = res & by_unit[:, kind * 9:(kind + 1) * 9, :].reshape(n, 81)[:, UNITS_INVERSE[kind]]
+    return res
+
+
+def others_or(x, axis):
+    """ For an axis of length 3, OR of the two other elements for each element """
+    return np.roll(x, 1, axis) | np.roll(x, 2, axis)
+
+
+def eliminate_singles(poss):
+    """ Remove values of the cells with one possibility from their rows, columns and 3x3 squares.
+    Return the updated possibilities, and the mask of boards with conflicting singles"""
+    single = POPCOUNT[poss] == 1
+    single_bits = np.where(single, poss, 0).astype(np.uint16)
+    by_unit = single_bits[:, UNITS]
+    unit_or = np.bitwise_or.reduce(by_unit, axis=2)
+    # two cells with the same single value in a unit
+    conflict = (POPCOUNT[unit_or] != single[:, UNITS].sum(axis=2)).any(axis=1)
+
+    taken = unit_or[:, :, None] & ~by_unit
+    cell_taken = taken[:, 0:9, :].reshape(-1, 81)[:, UNITS_INVERSE[0]]
+    for kind in (1, 2):
+        cell_taken = cell_taken | taken[:, kind * 9:(kind + 1) * 9, :].reshape(-1, 81)[:, UNITS_INVERSE[kind]]
+
+    return poss & ~cell_taken, conflict
+
+
+def hidden_singles(poss):
+    """ Set the cells, which are the only place for a value in a row, column or 3x3 square.
+    Return the updated possibilities, and the mask of boards where some value has no place
+    in a unit, or a cell is the only place for two values"""
+    by_unit = poss[:, UNITS]
+    # bit-parallel "seen once" / "seen twice" accumulators over the cells of each unit
+    once = np.zeros(by_unit.shape[:2], dtype=np.uint16)
+    twice = np.zeros(by_unit.shape[:2], dtype=np.uint16)
+    for i in range(9):
+        twice |= once & by_unit[:, :, i]
+        once |= by_unit[:, :, i]
+
+    conflict = (once != ALL_VALUES).any(axis=1)
+    only = once & ~twice
+    hit = by_unit & only[:, :, None]
+    conflict |= (POPCOUNT[hit] > 1).any(axis=(1, 2))
+
+    forced = np.where(hit != 0, hit, ALL_VALUES).astype(np.uint16)
+    return poss & units2cells(forced), conflict
+
+
+def pointing(poss):
+    """ If a value in a 3x3 square is possible only in one row (column),
+    remove it from the rest of that row (column), outside of the square"""
+    n = poss.shape[0]
+    for transpose in (False, True):
+        grid = poss.reshape(n, 9, 9)
+        if transpose:
+            grid = grid.transpose(0, 2, 1)
+
+        # values, possible in each row segment of 3 cells: (board, band, row in band, stack)
+        seg = np.bitwise_or.reduce(grid.reshape(n, 9, 3, 3), axis=3).reshape(n, 3, 3, 3)
+        only_here = seg & ~others_or(seg, 2)
+        # remove from the row segments in the other stacks
+        elim = others_or(only_here, 3).reshape(n, 9, 3)
+        grid = (grid.reshape(n, 9, 3, 3) & ~elim[:, :, :, None]).reshape(n, 9, 9)
+
+        if transpose:
+            grid = grid.transpose(0, 2, 1)
+        poss = np.ascontiguousarray(grid).reshape(n, 81)
+
+    return poss
+
+
+def naked_pairs_and_triplets(poss):
+    """ If 2 (3) cells of a unit have the same 2 (3) possibilities, remove those values from the other cells.
+    Return the updated possibilities, and the mask of boards with more such cells than values"""
+    by_unit = poss[:, UNITS]
+    l = POPCOUNT[by_unit]
+    same = (by_unit[:, :, :, None] == by_unit[:, :, None, :]).sum(axis=3)
+    candidate = (l == 2) | (l == 3)
+    conflict = (candidate & (same > l)).any(axis=(1, 2))
+
+    naked = candidate & (same == l)
+    naked_bits = np.bitwise_or.reduce(np.where(naked, by_unit, 0).astype(np.uint16), axis=2)
+    mask = np.where(naked, ALL_VALUES, ~naked_bits[:, :, None] & ALL_VALUES).astype(np.uint16)
+    return poss & units2cells(mask), conflict
+
+
+def propagate(poss, tricks=True):
+    """ Apply the eliminations to all boards until nothing changes.
+    Return the possibilities and the mask of boards found to have no solution"""
+    failed = np.zeros(poss.shape[0], dtype=bool)
+    active = np.arange(poss.shape[0])
+
+    while len(active) > 0:
+        cur = poss[active]
+        before = cur.copy()
+
+        cur, conflict = eliminate_singles(cur)
+        if tricks:
+            cur, conflict2 = hidden_singles(cur)
+            conflict |= conflict2
+            cur = pointing(cur)
+            cur, conflict2 = naked_pairs_and_triplets(cur)
+            conflict |= conflict2
+
+        conflict |= (cur == 0).any(axis=1)
+        poss[active] = cur
+        failed[active[conflict]] = True
+
+        # keep working on the boards, which have changed and have no conflicts yet
+        changed = (cur != before).any(axis=1) & ~conflict
+        active = active[changed]
+
+    return poss, failed
+
+
+def solve_batch(puzzles, check_unique=False, tricks=True, engine="classic"):
+    """ Solve an (N, 81) array of boards (0 denotes an empty cell).
+    Return the (N, 81) uint8 array of solutions (0s for boards without solution),
+    and the (N,) uint8 array with status of each board (BATCH_* constants).
+    With check_unique boards, which need backtracking, are checked for a second solution"""
+    puzzles = np.asarray(puzzles)
+    if puzzles.ndim != 2 or puzzles.shape[1] != 81:
+        my_error = ValueError("Expected an (N, 81) array of boards, got shape {0}".format(puzzles.shape))
+        raise my_error
+    if puzzles.size > 0 and (puzzles.min() < 0 or puzzles.max() > 9):
+        my_error = ValueError("Cells of the boards should be in range 0..9")
+        raise my_error
+
+    puzzles = puzzles.astype(np.uint8)
+    n = puzzles.shape[0]
+    bits = np.left_shift(np.uint16(1), np.maximum(puzzles, 1).astype(np.uint16) - 1)
+    poss = np.where(puzzles > 0, bits, ALL_VALUES).astype(np.uint16)
+    poss, failed = propagate(poss, tricks)
+
+    solutions = SINGLE_VALUE[poss]
+    status = np.full(n, BATCH_SOLVED, dtype=np.uint8)
+    status[failed] = BATCH_UNSOLVABLE
+    solutions[failed] = 0
+
+    # boards, which still need guessing, are solved one by one
+    nsolutions = 2 if check_unique else 1
+    for i in np.nonzero(~failed & (POPCOUNT[poss] > 1).any(axis=1))[0]:
+        sud = sudoku.Sudoku(solutions[i].reshape(9, 9).tolist())
+        found = sud.solve_board(False, False, nsolutions, tricks, engine)
+        if len(found) == 0:
+            status[i] = BATCH_UNSOLVABLE
+            solutions[i] = 0
+        else:
+            status[i] = BATCH_SEARCHED if len(found) == 1 else BATCH_MULTIPLE
+            solutions[i] = np.array(found[0], dtype=np.uint8).reshape(81)
+
+    return solutions, status
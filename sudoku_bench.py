@@ -0,0 +1,305 @@
+""" Benchmarks of the solver: solve times of 9x9 boards by each engine,
+and of 16x16 and 25x25 boards by the size-parametric engine.
+"python sudoku_bench.py suite" runs the reproducible suite on fixed corpora, and saves its results
+as the JSON baseline (--save), or compares them with the baseline (--compare)"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from math import isqrt
+
+from sudoku import *
+from data.test_data import *
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bench_baseline.json")
+SUITE_ENGINES = ("classic", "kernel", "incremental", "dlx", "backjump", "sat")
+# +1 - the higher value is the better one, -1 - the lower one
+METRIC_DIRECTIONS = {"solves_per_s": 1, "nodes_per_solve": -1, "seconds_per_board": -1, "peak_kb": -1}
+
+
+def shuffled_lines(rng, n):
+    """ Random order of the n lines (rows or columns) of n x n board, keeping bands (stacks) together"""
+    b = isqrt(n)
+    bands = list(range(b))
+    rng.shuffle(bands)
+    res = []
+    for band in bands:
+        lines = list(range(b))
+        rng.shuffle(lines)
+        res.extend(band * b + i for i in lines)
+    return res
+
+def make_board(n, ngiven, seed):
+    """ Make n x n board with ngiven cells: the pattern solution is shuffled
+    (rows in bands, bands, columns in stacks, stacks, values) and cells are removed at random.
+    The board has at least one solution, but it is not necessary unique"""
+    rng = random.Random(seed)
+    b = isqrt(n)
+    rows = shuffled_lines(rng, n)
+    cols = shuffled_lines(rng, n)
+    vals = list(range(1, n + 1))
+    rng.shuffle(vals)
+    board = [[vals[(b * (r % b) + r // b + c) % n] for c in cols] for r in rows]
+
+    cells = list(range(n * n))
+    rng.shuffle(cells)
+    for idx in cells[ngiven:]:
+        board[idx // n][idx % n] = 0
+
+    return board
+
+def time_solve(boards, engine, nsolutions=1, repeat=1, tricks=True):
+    """ Solve each board repeat times, return the list of the best times (in seconds) for each board"""
+    res = []
+    # as timeit does, the garbage collector doesn't run in the middle of the measured solves
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for b in boards:
+            sud = Sudoku(b)
+            best = None
+            for i in range(repeat):
+                t0 = time.perf_counter()
+                sud.solve_board(False, False, nsolutions, tricks, engine)
+                t = time.perf_counter() - t0
+                if best is None or t < best:
+                    best = t
+            res.append(best)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return res
+
+def print_times(name, times):
+    print("{0:<28} boards {1:3}  mean {2:8.4f}s  max {3:8.4f}s".format(name, len(times), sum(times) / len(times),
+                                                                     max(times)))
+
+def bench_9x9(repeat=5):
+    """ 9x9 boards from the test data, by each engine"""
+    boards = [field_hard, board_2solutions, sudoku_str2state(field_19)]
+    for engine in ("classic", "kernel", "incremental", "dlx", "backjump", "sat"):
+        print_times("9x9 {0}".format(engine), time_solve(boards, engine, 2, repeat))
+
+def bench_nxn(n, ngiven, nboards=10, repeat=1, engines=("incremental",)):
+    """ n x n boards made by make_board with seeds 0..nboards-1"""
+    boards = [make_board(n, ngiven, seed) for seed in range(nboards)]
+    for engine in engines:
+        print_times("{0}x{0}, {1} given, {2}".format(n, ngiven, engine), time_solve(boards, engine, 1, repeat))
+
+def bench_backjump():
+    """ Nodes and times of the backjumping search against the chronological one on the hard 9x9 boards"""
+    boards = {"field_hard": field_hard, "field_19": sudoku_str2state(field_19)}
+    for tricks in (True, False):
+        for (name, b) in boards.items():
+            sud = Sudoku(b)
+            t = time_solve([b], "classic", 2, 1, tricks)[0]
+            print("{0} tricks={1} classic: {2:.4f}s".format(name, tricks, t))
+            for (label, backjump, max_nogoods) in (("chronological", False, 0), ("backjump", True, 0),
+                                                   ("backjump+nogoods", True, 1000)):
+                t0 = time.perf_counter()
+                sud.solve_board_backjump(False, False, 2, tricks, backjump, max_nogoods)
+                t = time.perf_counter() - t0
+                stats = sud.backjump_stats
+                print("    {0:<18} nodes {1:6}  levels skipped {2:5}  nogood prunings {3:4}  {4:.4f}s".format(
+                    label, stats["nodes"], stats["levels_skipped"], stats["nogood_prunings"], t))
+
+def bench_canonical_form(nboards=10):
+    """ Canonical forms of 9x9 boards with 22, 25 and 30 given cells made by make_board, and of their solutions"""
+    boards = [make_board(9, ngiven, seed) for ngiven in (22, 25, 30) for seed in range(nboards)]
+    for (name, bl) in (("puzzles", boards), ("solutions", [make_board(9, 81, seed) for seed in range(nboards)])):
+        times = []
+        for b in bl:
+            t0 = time.perf_counter()
+            canonical_form(b)
+            times.append(time.perf_counter() - t0)
+        print_times("canonical_form, {0}".format(name), times)
+        print("    {0:.0f} boards per hour".format(3600 * len(times) / sum(times)))
+
+
+def hard_corpus(nboards=8, seed=0):
+    """ Synthetic hard set: field_hard and field_19 under random symmetry transforms.
+    The boards are as hard, but the search meets the cells and values in other order"""
+    rng = random.Random(seed)
+    res = []
+    for i in range(nboards):
+        board = field_hard if i % 2 == 0 else sudoku_str2state(field_19)
+        relabel = [0] + list(range(1, 10))
+        rng.shuffle(relabel)
+        relabel = [0] + [v for v in relabel if v != 0]
+        transform = (rng.random() < 0.5, shuffled_lines(rng, 9), shuffled_lines(rng, 9), relabel)
+        res.append(apply_transform(board, transform))
+    return res
+
+def peak_memory(func):
+    """ Peak of the memory (in KiB), allocated by Python objects during func() """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def engine_nodes(board, engine, nsolutions):
+    """ Nodes of the search for the engines, which count them (None for the others):
+    values tried by the classic search (see SolverStats), assignments tried by the backjumping search,
+    decisions of the SAT solver"""
+    sud = Sudoku(board)
+    if engine == "classic":
+        stats = SolverStats()
+        sud.solve_board(False, False, nsolutions, True, engine, stats)
+        return stats.nodes
+    sud.solve_board(False, False, nsolutions, True, engine)
+    if engine == "backjump":
+        return sud.backjump_stats["nodes"]
+    elif engine == "sat":
+        return sud.sat_stats["decisions"]
+    return None
+
+def bench_solve_corpus(name, boards, engines=SUITE_ENGINES, repeat=3, nsolutions=2):
+    """ Solves per second (of the best of repeat runs for each board), nodes per solve
+    and the memory peak for each engine. nsolutions=2 proves the uniqueness, as the generators do"""
+    results = {}
+    for engine in engines:
+        times = time_solve(boards, engine, nsolutions, repeat)
+        metrics = {"solves_per_s": len(boards) / sum(times)}
+        nodes = [engine_nodes(b, engine, nsolutions) for b in boards]
+        if not (None in nodes):
+            metrics["nodes_per_solve"] = sum(nodes) / len(nodes)
+        metrics["peak_kb"] = peak_memory(lambda: time_solve(boards, engine, nsolutions))
+        results["solve/{0}/{1}".format(name, engine)] = metrics
+    return results
+
+def generate_board(method, ngiven, seed):
+    """ Generate the board with ngiven cells from the solution make_board(9, 81, seed)
+    by generate_board_recursive or generate_board_annealing, with the RNG seeded by seed"""
+    sud = Sudoku(make_board(9, 81, seed))
+    sud.rnd_seed = seed + 1
+    # the shared cache of numbers of solutions would make the later runs faster
+    sud.count_cache = SolutionCountCache()
+    if method == "recursive":
+        return sud.generate_board_recursive(ngiven)
+    return sud.generate_board_annealing(ngiven, 1000, False)
+
+def bench_generation(ngivens=(30, 26, 24), nseeds=3, repeat=3):
+    """ Generation time per board (the best of repeat runs for each seed) and the memory peak
+    for each method and ngiven. Return the results and the generated boards (the corpus of generated puzzles)"""
+    results = {}
+    boards = []
+    for method in ("recursive", "annealing"):
+        for ngiven in ngivens:
+            times = []
+            for seed in range(nseeds):
+                best = None
+                for i in range(repeat):
+                    t0 = time.perf_counter()
+                    board = generate_board(method, ngiven, seed)
+                    t = time.perf_counter() - t0
+                    if best is None or t < best:
+                        best = t
+                times.append(best)
+                if board:
+                    boards.append(board)
+            results["generate/{0}/{1}".format(method, ngiven)] = {
+                "seconds_per_board": sum(times) / len(times),
+                "peak_kb": peak_memory(lambda: generate_board(method, ngiven, 0))}
+    return results, boards
+
+def run_suite(repeat=3):
+    """ Run the benchmarks on the fixed corpora: the boards from data/test_data.py,
+    the puzzles made by the generators with fixed seeds, and the synthetic hard set"""
+    (results, generated) = bench_generation(repeat=repeat)
+    corpora = (("test_data", [field_hard, board_2solutions, board_1solution, sudoku_str2state(field_19)]),
+               ("generated", generated), ("hard", hard_corpus()))
+    for (name, boards) in corpora:
+        results.update(bench_solve_corpus(name, boards, SUITE_ENGINES, repeat))
+    return results
+
+def save_baseline(results, path=BASELINE_PATH):
+    baseline = {"python": platform.python_version(), "machine": platform.machine(),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results}
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=1, sort_keys=True)
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+def compare_results(results, baseline, tolerance=0.3):
+    """ Compare the results with the baseline's ones. Return the list of
+    (benchmark, metric, baseline value, value, relative change) for each metric,
+    and the list of regressions among them: changes for the worse by more than tolerance"""
+    changes = []
+    regressions = []
+    for (name, metrics) in sorted(results.items()):
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        for (metric, value) in sorted(metrics.items()):
+            if not (metric in base) or base[metric] == 0:
+                continue
+            change = value / base[metric] - 1
+            entry = (name, metric, base[metric], value, change)
+            changes.append(entry)
+            if change * METRIC_DIRECTIONS[metric] < -tolerance:
+                regressions.append(entry)
+    return changes, regressions
+
+def print_results(results):
+    for (name, metrics) in sorted(results.items()):
+        print("{0:<32} ".format(name) + "  ".join("{0} {1:.4g}".format(m, v) for (m, v) in sorted(metrics.items())))
+
+def print_comparison(changes, regressions, tolerance):
+    for entry in changes:
+        flag = "REGRESSION" if entry in regressions else ""
+        print("{0:<32} {1:<18} {2:12.4g} -> {3:12.4g} {4:+7.1%} {5}".format(*entry, flag))
+    print("{0} regression(s) beyond {1:.0%} of {2} metrics".format(len(regressions), tolerance, len(changes)))
+
+def main(argv=None):
+    """ Without arguments, print the benchmarks of the engines and board sizes.
+    "suite" runs the reproducible suite, --save stores its results as the baseline,
+    --compare reports the changes against the baseline, and exits with 1 if there are regressions"""
+    parser = argparse.ArgumentParser(description="Benchmarks of the Sudoku solver")
+    commands = parser.add_subparsers(dest="command")
+    suite = commands.add_parser("suite", help="run the benchmark suite on the fixed corpora")
+    suite.add_argument("--save", nargs="?", const=BASELINE_PATH, help="save the results as the baseline")
+    suite.add_argument("--compare", nargs="?", const=BASELINE_PATH, help="compare the results with the baseline")
+    suite.add_argument("--tolerance", type=float, default=0.3, help="relative change, which is a regression")
+    suite.add_argument("--repeat", type=int, default=3, help="runs of each solve, the best time is taken")
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        bench_9x9()
+        bench_backjump()
+        bench_canonical_form()
+        bench_nxn(16, 100, engines=("incremental", "sat"))
+        bench_nxn(25, 320, engines=("incremental", "sat"))
+        # the backtracking has a heavy tail here, learned clauses of the SAT solver keep it bounded
+        bench_nxn(25, 300, 6, engines=("incremental", "sat"))
+        return 0
+
+    results = run_suite(args.repeat)
+    print_results(results)
+    if args.save is not None:
+        save_baseline(results, args.save)
+        print("Saved the baseline to {0}".format(args.save))
+    if args.compare is not None:
+        baseline = load_baseline(args.compare)
+        if baseline["python"] != platform.python_version() or baseline["machine"] != platform.machine():
+            print("The baseline was made with Python {0} on {1}, times could differ".format(baseline["python"],
+                                                                                         baseline["machine"]))
+        (changes, regressions) = compare_results(results, baseline, args.tolerance)
+        print_comparison(changes, regressions, args.tolerance)
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,48 +1,141 @@
+import multiprocessing
 import pygame
 import sudoku
 import time
 import random
+from collections import deque
 from tkinter import messagebox
 
 def generate_one_field(ngiven=23, randseed = None):
     """Generate a field with number of given cells ngiven.
     Field is represented as 9x9 matrix of integers (as Sudoku.state).
     Optionally randseed could be set, to achive reproducible fields."""
-    sud=sudoku.Sudoku()
-    if randseed is not None:
-        sud.rnd_seed = randseed
-    for i in range(3):
-        sud.clear()
-        #fill 3 3x3 squares with random permutations of 1..9
-        sq1=list(range(1,10))
-        sud.my_shuffle(sq1)
-        sq2 = list(range(1, 10))
-        sud.my_shuffle(sq2)
-        sq3 = list(range(1, 10))
-        sud.my_shuffle(sq3)
-
-        sud.state=[
-            [sq1[0], sq1[1], sq1[2], 0, 0, 0, 0, 0, 0],
-            [sq1[3], sq1[4], sq1[5], 0, 0, 0, 0, 0, 0],
-            [sq1[6], sq1[7], sq1[8], 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, sq2[0], sq2[1], sq2[2], 0, 0, 0],
-            [0, 0, 0, sq2[3], sq2[4], sq2[5], 0, 0, 0],
-            [0, 0, 0, sq2[6], sq2[7], sq2[8], 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, sq3[0], sq3[1], sq3[2]],
-            [0, 0, 0, 0, 0, 0, sq3[3], sq3[4], sq3[5]],
-            [0, 0, 0, 0, 0, 0, sq3[6], sq3[7], sq3[8]],
-        ]
-        #find first solution for this field, using randomization in solve_board
-        solutions = sud.solve_board(True, True, 1)
-        sud.state = sudoku.copy_state(solutions[0])
-
-        #try to remove some cells and leave ngiven cells, using simulated annealing-like method
-        board = sud.generate_board_annealing(ngiven, 500, False)
-
-        #return the generated field, or None if generation wasn't successful
-        return board
-
-    return None
+    if randseed is None:
+        randseed = random.Random().randrange(1000000000)
+
+    #fill 3 3x3 squares with random permutations of 1..9, solve the rest,
+    #and remove cells, using simulated annealing-like method
+    #return the generated field, or None if generation wasn't successful
+    return sudoku.generate_puzzle(randseed, ngiven)
+
+
+class PuzzlePool:
+    """ Fields, generated in advance by a background worker process, for each number of given cells
+    asked so far. The worker makes one field at a time: first the field with the given RNG seed,
+    if it was asked, then a field for the number of given cells, which is waited for,
+    then it refills the pools up to size fields.
+    The worker, which hasn't made the field in time (it died or hung, see task_timeout), is replaced"""
+
+    def __init__(self, ngivens=(25,), size=3, timeout=60):
+        self.size = size
+        self.timeout = timeout
+        # workers replaced since the last field was made
+        self.restarts = 0
+        # called (from a thread of the worker pool) when the field in progress is ready
+        self.on_ready = None
+        # ngiven -> deque of (randseed, field)
+        self.fields = {}
+        for ngiven in ngivens:
+            self.fields[ngiven] = deque()
+        # the field with the RNG seed, asked by the user last: (randseed, ngiven) -> field or None
+        self.seeded = {}
+        self.seeded_wanted = None
+        self.wanted = None
+        self.rng = random.Random()
+        self.worker = multiprocessing.Pool(1)
+        # the field in progress: (randseed, ngiven, seeded, AsyncResult, start time)
+        self.task = None
+
+    def take(self, ngiven, randseed=None):
+        """ Take a field with ngiven given cells (and the RNG seed randseed, if it is set) from the pool.
+        Return (randseed, field), field is None if the seeded generation wasn't successful,
+        or None if the field isn't ready yet: it is generated next, call take again later"""
+        if not (ngiven in self.fields):
+            self.fields[ngiven] = deque()
+
+        if randseed is not None:
+            if (randseed, ngiven) in self.seeded:
+                return (randseed, self.seeded.pop((randseed, ngiven)))
+            # the seeded field, asked before, isn't wanted any more
+            self.seeded.clear()
+            self.seeded_wanted = (randseed, ngiven)
+        elif len(self.fields[ngiven]) > 0:
+            self.wanted = None
+            res = self.fields[ngiven].popleft()
+            self.poll()
+            return res
+        else:
+            self.wanted = ngiven
+
+        self.poll()
+        return None
+
+    def poll(self):
+        """ Collect the field, made by the worker, and start the next one. Doesn't wait for the worker.
+        The field, which failed or timed out, is dropped: the seeded one is reported as not generated,
+        the pool gets another one"""
+        if self.task is not None:
+            (randseed, ngiven, seeded, result, started) = self.task
+            if result.ready():
+                self.task = None
+                self.restarts = 0
+                try:
+                    field = result.get()
+                except Exception:
+                    field = None
+            elif time.perf_counter() - started > self.task_timeout(ngiven):
+                # the worker died (the field is lost) or hung
+                self.restart()
+                field = None
+            else:
+                return
+            if seeded:
+                # the user may have asked another seed meanwhile, only the wanted field is kept
+                if self.seeded_wanted == (randseed, ngiven):
+                    self.seeded[(randseed, ngiven)] = field
+                    self.seeded_wanted = None
+            elif field is not None:
+                self.fields[ngiven].append((randseed, field))
+                if self.wanted == ngiven:
+                    self.wanted = None
+
+        seeded = False
+        if self.seeded_wanted is not None:
+            (randseed, ngiven) = self.seeded_wanted
+            seeded = True
+        elif self.wanted is not None:
+            ngiven = self.wanted
+        else:
+            # the smallest pool, if it isn't full
+            ngiven = min(self.fields, key=lambda k: len(self.fields[k]))
+            if len(self.fields[ngiven]) >= self.size:
+                return
+        if not seeded:
+            randseed = self.rng.randrange(1000000000)
+
+        result = self.worker.apply_async(sudoku.generate_puzzle, (randseed, ngiven),
+                                         callback=self.task_done, error_callback=self.task_done)
+        self.task = (randseed, ngiven, seeded, result, time.perf_counter())
+
+    def task_timeout(self, ngiven):
+        """ Seconds, the worker gets for a field with ngiven given cells (see sudoku.generate_timeout)"""
+        return sudoku.generate_timeout(self.timeout, ngiven, self.restarts)
+
+    def task_done(self, result):
+        if self.on_ready is not None:
+            self.on_ready()
+
+    def restart(self):
+        """ Replace the worker, dropping the field in progress"""
+        self.close()
+        self.worker = multiprocessing.Pool(1)
+        self.task = None
+        self.restarts += 1
+
+    def close(self):
+        """ Stop the worker, dropping the field in progress"""
+        self.worker.terminate()
+        self.worker.join()
 
 
 def draw_square(surf,ulx,uly,col,sz,lwd):
@@ -52,15 +145,15 @@ def draw_square(surf,ulx,uly,col,sz,lwd):
         (ulx + sz, uly + sz),
         (ulx, uly + sz)), lwd)
 
-def draw_possibilities(surf,cx,cy,poss,fnt):
+def draw_possibilities(surf,cx,cy,poss,render):
     """Draw possible values (represented by set poss) for the cell at (cx,cy),
-    using for fnt"""
+    render(text, color) returns the surface with the text"""
     margin = 5
     txt_x = cx + margin
     txt_y = cy + margin
     cnt = 0
     for p in poss:
-        txt_blit = fnt.render(str(p), True, (64,64,128))
+        txt_blit = render(str(p), (64,64,128))
         surf.blit(txt_blit, (txt_x, txt_y))
         (txt_w, txt_h) = txt_blit.get_size()
         txt_x += int(txt_w*1.5)
@@ -90,7 +183,7 @@ def display_help():
 
 
 class SudokuField:
-    def __init__(self, field_sz, sq_sz):
+    def __init__(self, field_sz, sq_sz, puzzle_pool=None):
         self.field_sz = field_sz
         self.sq_sz = sq_sz
         self.selection = None
@@ -100,30 +193,61 @@ class SudokuField:
         self.field_px = None
         self.sudoku_number=""
         self.display_possibilities = False
+        self.sudoku = sudoku.Sudoku()
+        self.src_field = sudoku.copy_state(self.sudoku.state)
+        #fields are taken from puzzle_pool (PuzzlePool), if it is set, or generated here
+        self.puzzle_pool = puzzle_pool
+        #(ngiven, randseed) of the field, which is waited for from the pool
+        self.pending = None
+        #fonts and rendered texts (by font, text and color), made on the first drawing
+        self.fonts = None
+        self.glyphs = {}
+        #what is drawn in each cell (see cell_look), for drawing only the changed cells
+        self.cell_looks = None
 
     def generate(self,ngiven=25):
         """ Try to generate sudoku with ngiven given cells.
-        If self.randseed is set, use it to set RNG for reproducible result"""
+        If self.randseed is set, use it to set RNG for reproducible result.
+        With the puzzle pool the field is replaced, when it is ready (see update)"""
+        if self.puzzle_pool is not None:
+            self.pending = (ngiven, self.randseed)
+            self.update()
+            return
+
         if self.randseed is not None:
             randseed = self.randseed
         else:
             rng = random.Random()
             randseed = rng.randrange(1000000000)
 
-        #encode sudoku number as "RNG_seed/ngiven"
-        sud_num = str(randseed)+"/"+str(ngiven)
-
-        field = generate_one_field(ngiven, randseed)
+        self.set_field(generate_one_field(ngiven, randseed), randseed, ngiven)
+
+    def update(self):
+        """ Take the field, which is waited for, if the puzzle pool has it"""
+        if self.puzzle_pool is None:
+            return
+        self.puzzle_pool.poll()
+        if self.pending is None:
+            return
+
+        (ngiven, randseed) = self.pending
+        res = self.puzzle_pool.take(ngiven, randseed)
+        if res is not None:
+            self.pending = None
+            (randseed, field) = res
+            self.set_field(field, randseed, ngiven)
+
+    def set_field(self, field, randseed, ngiven):
+        """ Start playing the generated field, or report the failed generation, if field is None"""
         if field is not None:
             self.sudoku = sudoku.Sudoku(field)
             self.src_field = sudoku.copy_state(self.sudoku.state)
-            self.sudoku_number=sud_num
+            #encode sudoku number as "RNG_seed/ngiven"
+            self.sudoku_number = str(randseed)+"/"+str(ngiven)
+            self.selection = None
         else:
             messagebox.showinfo(title = "Warning",message="Could not generate sudoku, try one more time")
 
-        if self.sudoku is None:
-            self.sudoku = sudoku.Sudoku()
-
     def process_event(self, ev):
         """ Process keyboard and mouse events, passed to the instance of SudokuField"""
         if ev.type==pygame.KEYDOWN:
@@ -136,18 +260,20 @@ class SudokuField:
 
             if ch == "c":
                 self.sudoku.state = sudoku.copy_state(self.src_field)
+                self.sudoku.track()
 
             if "0123456789".__contains__(ch):
                 if self.selection is not None:
                     v = int(ch)
                     (r,c) = self.selection
-                    self.sudoku.state[r][c]=v
+                    self.sudoku.assign(r, c, v)
                     self.selection = None
 
             if ch == "a":
                 solutions = self.sudoku.solve_board(False, False, 2)
                 if len(solutions)>=1:
                     self.sudoku.state = solutions[0]
+                    self.sudoku.track()
 
                 if len(solutions)>1:
                     messagebox.showinfo(title="Warning", message="More than one solution found!")
@@ -171,16 +297,39 @@ class SudokuField:
                 if self.src_field[r][c]==0:
                     self.selection = (r,c)
 
-    def draw(self, surf, pos, small_sq_px):
+    def glyph(self, font, txt, col):
+        """ Surface with the text txt, rendered by the font ("value", "given" or "poss") in color col.
+        The surfaces are rendered once and reused"""
+        key = (font, txt, col)
+        if not (key in self.glyphs):
+            self.glyphs[key] = self.fonts[font].render(txt, True, col)
+        return self.glyphs[key]
+
+    def cell_look(self, r, c, selected):
+        """ Everything which the cell looks like: its value, is it given, selected, conflicting,
+        and the possible values, if they are displayed"""
+        v = self.sudoku.state[r][c]
+        if v == 0:
+            poss = tuple(self.sudoku.cell_get_possibilities_tracked(r, c)) if self.display_possibilities else None
+            return (0, False, selected, True, poss)
+        return (v, self.src_field[r][c] != 0, selected, self.sudoku.cell_has_no_conflicts_tracked(r, c), None)
+
+    def draw(self, surf, pos, small_sq_px, full=False, bg=(192, 192, 192)):
         """ Draw sudoku field: the grid, values of given cells, values of cells inputted by user,
         optionally - possibilities for each cell.
-        Draw field at (x,y)=pos, using the size of small square small_sq_px"""
-        my_font = pygame.font.SysFont("Arial", 72, False)
-        my_font_bold = pygame.font.SysFont("Arial", 72, True)
-        my_font_poss = pygame.font.SysFont("Arial", 20, False)
+        Draw field at (x,y)=pos, using the size of small square small_sq_px.
+        Only the cells, which look differently since the last drawing, are drawn again, over the background
+        color bg. With full=True (or the first time, or at another place) the whole field is drawn.
+        Return the list of the drawn rectangles"""
+        if self.fonts is None:
+            self.fonts = {"value": pygame.font.SysFont("Arial", 72, False),
+                          "given": pygame.font.SysFont("Arial", 72, True),
+                          "poss": pygame.font.SysFont("Arial", 20, False)}
 
         margin = 5
         (ulx, uly) = pos
+        if pos != self.pos or small_sq_px != self.cell_px or self.cell_looks is None:
+            full = True
         self.pos = pos
 
         self.cell_px = small_sq_px
@@ -196,58 +345,70 @@ class SudokuField:
             selr = -1
             selc = -1
 
-        #draw a border around the field
-        draw_square(surf, ulx - 1, uly - 1, (64, 64, 64), field_px + 1, 1)
-        draw_square(surf, ulx - 2, uly - 2, (128, 128, 128), field_px + 3, 1)
-        draw_square(surf, ulx - 3, uly - 3, (192, 192, 192), field_px + 5, 1)
+        if full:
+            self.cell_looks = [[None] * self.field_sz for i in range(self.field_sz)]
+            #draw a border around the field
+            draw_square(surf, ulx - 1, uly - 1, (64, 64, 64), field_px + 1, 1)
+            draw_square(surf, ulx - 2, uly - 2, (128, 128, 128), field_px + 3, 1)
+            draw_square(surf, ulx - 3, uly - 3, (192, 192, 192), field_px + 5, 1)
 
+        rects = []
         for r in range(self.field_sz):
             for c in range(self.field_sz):
+                look = self.cell_look(r, c, r == selr and c == selc)
+                if look == self.cell_looks[r][c]:
+                    continue
+                self.cell_looks[r][c] = look
+                (v, given, selected, no_conflicts, poss) = look
+
                 cx = ulx + c * small_sq_px
                 cy = uly + r * small_sq_px
+                if not full:
+                    surf.fill(bg, (cx, cy, small_sq_px, small_sq_px))
+                    rects.append(pygame.Rect(cx, cy, small_sq_px, small_sq_px))
 
                 #if this square is selected, highlight it in light green
-                if r == selr and c == selc:
+                if selected:
                     surf.fill((64, 128, 64), (cx, cy, small_sq_px - 1, small_sq_px - 1))
 
                 #draw a border around the small square
                 draw_square(surf, cx, cy, (128, 128, 128), small_sq_px - 1, 1)
 
+                if not full:
+                    #the border of the 3x3 square goes along the edges of its cells
+                    draw_square(surf, ulx + (c // self.sq_sz) * big_sq_px, uly + (r // self.sq_sz) * big_sq_px,
+                                (0, 0, 0), big_sq_px - 1, 1)
+
                 #draw possible values for empty cells, if self.display_possibilities is set
-                if self.sudoku.state[r][c] == 0:
-                    if self.display_possibilities:
-                        poss = self.sudoku.cell_get_possibilities(r,c)
-                        draw_possibilities(surf,cx,cy,poss,my_font_poss)
+                if v == 0:
+                    if poss is not None:
+                        draw_possibilities(surf, cx, cy, poss, lambda txt, col: self.glyph("poss", txt, col))
                     continue
-                else:
-                    txt = str(self.sudoku.state[r][c])
 
-                #choose different font and color for given cells (self.src_field[r][c] != 0),
+                #choose different font and color for given cells,
                 #and for inputted by user
-                if self.src_field[r][c] != 0:
-                    fnt = my_font_bold
-                    if self.sudoku.cell_has_no_conflicts(r, c):
-                        col = (0, 0, 0)
-                    else:
-                        col = (128, 0, 0)
+                if given:
+                    fnt = "given"
+                    col = (0, 0, 0) if no_conflicts else (128, 0, 0)
                 else:
-                    fnt = my_font
-                    if self.sudoku.cell_has_no_conflicts(r, c):
-                        col = (64, 64, 128)
-                    else:
-                        col = (128, 64, 64)
+                    fnt = "value"
+                    col = (64, 64, 128) if no_conflicts else (128, 64, 64)
 
                 #draw the value in the cell
-                txt_blit = fnt.render(txt, True, col)
+                txt_blit = self.glyph(fnt, str(v), col)
                 (txt_szx, txt_szy) = txt_blit.get_size()
                 txt_x = cx + (small_sq_px - txt_szx) // 2
                 txt_y = cy + (small_sq_px - txt_szy) // 2
                 surf.blit(txt_blit, (txt_x, txt_y))
 
-        #draw borders around 3x3 squares
-        for r in range(self.field_sz // self.sq_sz):
-            for c in range(self.field_sz // self.sq_sz):
-                draw_square(surf, ulx + c * big_sq_px, uly + r * big_sq_px, (0, 0, 0), big_sq_px - 1, 1)
+        if full:
+            #draw borders around 3x3 squares
+            for r in range(self.field_sz // self.sq_sz):
+                for c in range(self.field_sz // self.sq_sz):
+                    draw_square(surf, ulx + c * big_sq_px, uly + r * big_sq_px, (0, 0, 0), big_sq_px - 1, 1)
+            rects = [pygame.Rect(ulx - 3, uly - 3, field_px + 6, field_px + 6)]
+
+        return rects
 
 
 class TextInput:
@@ -331,7 +492,8 @@ def process_text_input(field,text,text_type):
 
 def main():
 
-    field = SudokuField(9,3)
+    puzzle_pool = PuzzlePool()
+    field = SudokuField(9,3,puzzle_pool)
     field.generate()
 
     pygame.init()
@@ -341,8 +503,6 @@ def main():
 
     head_font = pygame.font.SysFont("Arial", 36, False)
 
-    my_clock = pygame.time.Clock()
-
     help_displayed = False
 
     t0 = time.time()
@@ -350,71 +510,125 @@ def main():
     text_input = None
     text_input_type = ""
 
-    while True:
-        ev = pygame.event.poll()
-        if ev.type==pygame.QUIT:
-            break
+    #the worker wakes up the loop, when a field is ready
+    FIELD_READY = pygame.USEREVENT
+    puzzle_pool.on_ready = lambda: pygame.event.post(pygame.event.Event(FIELD_READY))
 
-        if text_input is not None:
-            text_input.process_event(ev)
-            if text_input.result is not None:
-                if text_input.result == "OK":
-                    process_text_input(field,text_input.text,text_input_type)
-                text_input = None
-        else:
-            field.process_event(ev)
+    #the whole window is drawn again, if it was covered, the background or the text input changed,
+    #otherwise only the changed cells and the header are updated
+    redraw = True
+    last_col = None
+    last_header = None
+    header_rect = pygame.Rect(0, 0, surface_w, 50)
 
-        if text_input is None and ev.type==pygame.KEYDOWN:
-            key = ev.key
-            ch = pygame.key.name(key)
-            if ch == "n":
-                if field.pos is not None:
-                    w = 600
-                    h = 70
-                    (ulx,uly) = field.pos
-                    txt_x = ulx + (field.field_px - w) // 2
-                    txt_y = uly + (field.field_px - h) // 2
-                    text_input = TextInput((txt_x, txt_y, w, h), 4, 32, "Number of given cells (21..50): ")
-                    text_input_type = "ngiven"
-                    field.selection = None
-
-            if ch == "r":
-                if field.pos is not None:
-                    w = 600
-                    h = 70
-                    (ulx,uly) = field.pos
-                    txt_x = ulx + (field.field_px - w) // 2
-                    txt_y = uly + (field.field_px - h) // 2
-                    text_input = TextInput((txt_x, txt_y, w, h), 10, 32,
-                                           "RNG seed (0..{0}): ".format(2**31))
-                    text_input_type = "randseed"
-                    field.selection = None
-
-        if  field.sudoku.board_has_no_conflicts() and field.sudoku.empty_cells_count()==0:
+    while True:
+        field.update()
+
+        solved = field.sudoku.board_has_no_conflicts_tracked() and field.sudoku.empty_cells_count_tracked()==0
+        if solved:
             anim_time = time.time() - t0
             colors = [(255, 192, 192), (192, 255, 192), (192, 192, 255)]
             col = colors[int(anim_time*3)%3]
         else:
             col = (192, 192, 192)
 
-        main_surface.fill(col)
-
-        field.draw(main_surface, (5, 55), 87)
-        if text_input is not None:
-            text_input.draw(main_surface)
+        if field.pending is not None:
+            #the pool is empty, show the progress of generation
+            spinner = "|/-\\"[int((time.time() - t0) * 8) % 4]
+            header = "Generating {0} {1}".format(field.pending[0], spinner)
+        else:
+            header = "№"+field.sudoku_number
 
-        txt_blit = head_font.render("№"+field.sudoku_number, True, (0,0,0))
-        txt_w = txt_blit.get_size()[0]
-        main_surface.blit(txt_blit,((surface_w-txt_w)//2,5))
+        if col != last_col or text_input is not None:
+            redraw = True
 
-        pygame.display.flip()
+        if redraw:
+            main_surface.fill(col)
+            field.draw(main_surface, (5, 55), 87, True)
+            if text_input is not None:
+                text_input.draw(main_surface)
+            rects = None
+        else:
+            rects = field.draw(main_surface, (5, 55), 87, bg=col)
+
+        if redraw or header != last_header:
+            main_surface.fill(col, header_rect)
+            txt_blit = head_font.render(header, True, (0,0,0))
+            txt_w = txt_blit.get_size()[0]
+            main_surface.blit(txt_blit,((surface_w-txt_w)//2,5))
+            if rects is not None:
+                rects.append(header_rect)
+
+        if rects is None:
+            pygame.display.flip()
+        elif len(rects) > 0:
+            pygame.display.update(rects)
+        redraw = False
+        last_col = col
+        last_header = header
 
         if not help_displayed:
             display_help()
             help_displayed = True
+            redraw = True
 
-        my_clock.tick(240)
+        #block until the next event, or the next step of the animation
+        if solved or field.pending is not None:
+            events = [pygame.event.wait(100)]
+        else:
+            events = [pygame.event.wait()]
+        events.extend(pygame.event.get())
+
+        stop = False
+        for ev in events:
+            if ev.type==pygame.QUIT:
+                stop = True
+                break
+
+            if ev.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                redraw = True
+
+            if text_input is not None:
+                text_input.process_event(ev)
+                if text_input.result is not None:
+                    if text_input.result == "OK":
+                        process_text_input(field,text_input.text,text_input_type)
+                    text_input = None
+                    redraw = True
+            else:
+                field.process_event(ev)
+
+            if text_input is None and ev.type==pygame.KEYDOWN:
+                key = ev.key
+                ch = pygame.key.name(key)
+                if ch == "n":
+                    if field.pos is not None:
+                        w = 600
+                        h = 70
+                        (ulx,uly) = field.pos
+                        txt_x = ulx + (field.field_px - w) // 2
+                        txt_y = uly + (field.field_px - h) // 2
+                        text_input = TextInput((txt_x, txt_y, w, h), 4, 32, "Number of given cells (21..50): ")
+                        text_input_type = "ngiven"
+                        field.selection = None
+
+                if ch == "r":
+                    if field.pos is not None:
+                        w = 600
+                        h = 70
+                        (ulx,uly) = field.pos
+                        txt_x = ulx + (field.field_px - w) // 2
+                        txt_y = uly + (field.field_px - h) // 2
+                        text_input = TextInput((txt_x, txt_y, w, h), 10, 32,
+                                               "RNG seed (0..{0}): ".format(2**31))
+                        text_input_type = "randseed"
+                        field.selection = None
+
+        if stop:
+            break
 
+    puzzle_pool.close()
     pygame.quit()
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
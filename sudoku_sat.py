@@ -0,0 +1,335 @@
+""" Pure Python CDCL SAT solver: two watched literals, 1UIP clause learning with VSIDS,
+phase saving, Luby restarts and removal of the learned clauses with high LBD.
+Used by Sudoku.solve_board_sat, but it doesn't know anything about Sudoku"""
+from heapq import heapify, heappop, heappush
+
+
+def luby(i):
+    """ i-th element (from 0) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, ..."""
+    size = 1
+    seq = 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+
+    return 1 << seq
+
+
+class SatSolver:
+    """ CDCL SAT solver. Variables are numbered from 1, clauses are lists of literals in DIMACS style
+    (v for the variable v being true, -v for false). Internally literal is 2 * v (true) or 2 * v + 1 (false),
+    so the negation of the literal is lit ^ 1"""
+
+    def __init__(self, nvars, restart_base=100, max_learned=2000):
+        """ Initialize the solver with nvars variables and no clauses """
+        self.nvars = nvars
+        self.restart_base = restart_base
+        self.max_learned = max_learned
+        # clauses, None for the removed learned clauses; the first literal of a reason clause is the implied one
+        self.clauses = []
+        self.learned = []
+        self.lbd = {}
+        self.watches = [[] for i in range(2 * nvars + 2)]
+        # value of each literal: 1 - true, 0 - false, -1 - not assigned
+        self.values = [-1] * (2 * nvars + 2)
+        self.level = [0] * (nvars + 1)
+        self.reason = [-1] * (nvars + 1)
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.seen = [False] * (nvars + 1)
+        # VSIDS activities and saved phases (True - positive literal is tried first), public to set the initial order
+        self.activity = [0.0] * (nvars + 1)
+        self.var_inc = 1.0
+        self.phase = [False] * (nvars + 1)
+        self.heap = []
+        self.ok = True
+        self.model = None
+        self.conflicts = 0
+        self.decisions = 0
+        self.restarts = 0
+
+    def add_clause(self, clause):
+        """ Add a clause (list of DIMACS literals). Return False, if the formula became unsatisfiable"""
+        self.cancel_until(0)
+        if not self.ok:
+            return False
+
+        lits = []
+        for x in clause:
+            lit = 2 * x if x > 0 else -2 * x + 1
+            v = self.values[lit]
+            if v == 1 or (lit ^ 1) in lits:
+                # satisfied at level 0 or a tautology
+                return True
+            if v == -1 and not (lit in lits):
+                lits.append(lit)
+
+        if len(lits) == 0:
+            self.ok = False
+        elif len(lits) == 1:
+            self.assign(lits[0], -1)
+            self.ok = self.propagate() == -1
+        else:
+            self.watches[lits[0]].append(len(self.clauses))
+            self.watches[lits[1]].append(len(self.clauses))
+            self.clauses.append(lits)
+
+        return self.ok
+
+    def assign(self, lit, reason):
+        values = self.values
+        values[lit] = 1
+        values[lit ^ 1] = 0
+        v = lit >> 1
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """ Unit propagation of the assignments on the trail. Return the index of the conflicting clause or -1"""
+        values = self.values
+        clauses = self.clauses
+        watches = self.watches
+        trail = self.trail
+        while self.qhead < len(trail):
+            false_lit = trail[self.qhead] ^ 1
+            self.qhead += 1
+            ws = watches[false_lit]
+            i = 0
+            j = 0
+            while i < len(ws):
+                ci = ws[i]
+                i += 1
+                c = clauses[ci]
+                if c is None:
+                    continue
+                if c[0] == false_lit:
+                    c[0] = c[1]
+                    c[1] = false_lit
+                first = c[0]
+                if values[first] == 1:
+                    ws[j] = ci
+                    j += 1
+                    continue
+
+                # look for a new literal to watch
+                moved = False
+                for k in range(2, len(c)):
+                    if values[c[k]] != 0:
+                        c[1] = c[k]
+                        c[k] = false_lit
+                        watches[c[1]].append(ci)
+                        moved = True
+                        break
+                if moved:
+                    continue
+
+                ws[j] = ci
+                j += 1
+                if values[first] == 0:
+                    while i < len(ws):
+                        ws[j] = ws[i]
+                        j += 1
+                        i += 1
+                    del ws[j:]
+                    return ci
+                self.assign(first, ci)
+            del ws[j:]
+
+        return -1
+
+    def bump(self, v):
+        """ Increase VSIDS activity of the variable v """
+        self.activity[v] += self.var_inc
+        if self.activity[v] > 1e100:
+            for u in range(1, self.nvars + 1):
+                self.activity[u] *= 1e-100
+            self.var_inc *= 1e-100
+            self.rebuild_heap()
+        elif self.values[2 * v] == -1:
+            heappush(self.heap, (-self.activity[v], v))
+
+    def rebuild_heap(self):
+        self.heap = [(-self.activity[v], v) for v in range(1, self.nvars + 1) if self.values[2 * v] == -1]
+        heapify(self.heap)
+
+    def analyze(self, confl):
+        """ Derive the 1UIP learned clause from the conflicting clause.
+        Return the clause (the asserting literal first) and the level to jump back to"""
+        clauses = self.clauses
+        level = self.level
+        reason = self.reason
+        seen = self.seen
+        trail = self.trail
+        cur_level = len(self.trail_lim)
+        learned = [-1]
+        counter = 0
+        p = -1
+        idx = len(trail) - 1
+        while True:
+            c = clauses[confl]
+            for q in (c if p == -1 else c[1:]):
+                v = q >> 1
+                if not seen[v] and level[v] > 0:
+                    seen[v] = True
+                    self.bump(v)
+                    if level[v] >= cur_level:
+                        counter += 1
+                    else:
+                        learned.append(q)
+            # the next literal of the current level to expand
+            while not seen[trail[idx] >> 1]:
+                idx -= 1
+            p = trail[idx]
+            idx -= 1
+            confl = reason[p >> 1]
+            seen[p >> 1] = False
+            counter -= 1
+            if counter == 0:
+                break
+        learned[0] = p ^ 1
+
+        # drop the literals, implied by the other literals of the clause
+        res = [learned[0]]
+        for q in learned[1:]:
+            r = reason[q >> 1]
+            if r == -1:
+                res.append(q)
+                continue
+            for x in clauses[r][1:]:
+                if not seen[x >> 1] and level[x >> 1] > 0:
+                    res.append(q)
+                    break
+        for q in learned:
+            seen[q >> 1] = False
+
+        # the literal of the highest level becomes the second watched one
+        bt_level = 0
+        if len(res) > 1:
+            best = 1
+            for k in range(2, len(res)):
+                if level[res[k] >> 1] > level[res[best] >> 1]:
+                    best = k
+            tmp = res[1]
+            res[1] = res[best]
+            res[best] = tmp
+            bt_level = level[res[1] >> 1]
+
+        return res, bt_level
+
+    def cancel_until(self, lvl):
+        """ Undo the assignments above the level lvl, saving their phases """
+        if len(self.trail_lim) <= lvl:
+            return
+        values = self.values
+        start = self.trail_lim[lvl]
+        for k in range(len(self.trail) - 1, start - 1, -1):
+            lit = self.trail[k]
+            v = lit >> 1
+            values[lit] = -1
+            values[lit ^ 1] = -1
+            self.phase[v] = (lit & 1) == 0
+            self.reason[v] = -1
+            heappush(self.heap, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.trail_lim[lvl:]
+        self.qhead = len(self.trail)
+
+    def pick_branch_var(self):
+        """ The unassigned variable with the highest activity, 0 if all variables are assigned """
+        if len(self.heap) > 8 * self.nvars + 100:
+            # drop the outdated entries, left by bump and cancel_until
+            self.rebuild_heap()
+        heap = self.heap
+        while len(heap) > 0:
+            (a, v) = heappop(heap)
+            if self.values[2 * v] == -1 and -a == self.activity[v]:
+                return v
+        return 0
+
+    def reduce_learned(self):
+        """ Remove the half of learned clauses with the highest LBD, except the reasons and the glue clauses"""
+        values = self.values
+        keep = []
+        candidates = []
+        for ci in self.learned:
+            c = self.clauses[ci]
+            locked = self.reason[c[0] >> 1] == ci and values[c[0]] == 1
+            if locked or self.lbd[ci] <= 2:
+                keep.append(ci)
+            else:
+                candidates.append(ci)
+        candidates.sort(key=lambda ci: (self.lbd[ci], len(self.clauses[ci])))
+        half = len(candidates) // 2
+        for ci in candidates[half:]:
+            self.clauses[ci] = None
+            del self.lbd[ci]
+        self.learned = keep + candidates[:half]
+        self.max_learned += 300
+
+    def solve(self, max_conflicts=None):
+        """ Search for a model. Return True (the model is in self.model, a list of bools indexed by variable),
+        False if the formula is unsatisfiable, or None, if max_conflicts conflicts were met first"""
+        self.model = None
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+        if self.propagate() != -1:
+            self.ok = False
+            return False
+        self.rebuild_heap()
+
+        conflicts = 0
+        restart_conflicts = 0
+        restart_limit = self.restart_base * luby(self.restarts)
+        while True:
+            confl = self.propagate()
+            if confl != -1:
+                conflicts += 1
+                restart_conflicts += 1
+                self.conflicts += 1
+                if len(self.trail_lim) == 0:
+                    self.ok = False
+                    return False
+
+                (learned, bt_level) = self.analyze(confl)
+                self.cancel_until(bt_level)
+                if len(learned) == 1:
+                    self.assign(learned[0], -1)
+                else:
+                    ci = len(self.clauses)
+                    self.clauses.append(learned)
+                    self.learned.append(ci)
+                    self.lbd[ci] = len(set(self.level[q >> 1] for q in learned))
+                    self.watches[learned[0]].append(ci)
+                    self.watches[learned[1]].append(ci)
+                    self.assign(learned[0], ci)
+                self.var_inc /= 0.95
+
+                if max_conflicts is not None and conflicts >= max_conflicts:
+                    self.cancel_until(0)
+                    return None
+            else:
+                if restart_conflicts >= restart_limit:
+                    self.restarts += 1
+                    restart_conflicts = 0
+                    restart_limit = self.restart_base * luby(self.restarts)
+                    self.cancel_until(0)
+                    continue
+                if len(self.learned) >= self.max_learned:
+                    self.reduce_learned()
+
+                v = self.pick_branch_var()
+                if v == 0:
+                    self.model = [False] + [self.values[2 * u] == 1 for u in range(1, self.nvars + 1)]
+                    self.cancel_until(0)
+                    return True
+
+                self.decisions += 1
+                self.trail_lim.append(len(self.trail))
+                self.assign(2 * v if self.phase[v] else 2 * v + 1, -1)
@@ -0,0 +1,233 @@
+""" Binary store of 9x9 boards: fixed-size records in one file, read through mmap.
+Each record holds the puzzle and its solution packed at 4 bits per cell, the "sudoku number"
+(RNG seed and number of given cells, as made by sudoku_game.SudokuField.generate), a difficulty level
+and flags. Record i is at a fixed offset, so it is read by number without parsing the file,
+and the packed boards are returned as memoryview slices of the mapped file.
+The packed boards are not boards for sudoku.solve_buffer or sudoku.Sudoku: PuzzleStore.cells(i, out)
+unpacks them to 81 cell values in a buffer, reused for all the records"""
+import mmap
+import os
+import struct
+from array import array
+
+import sudoku
+
+MAGIC = b"SUDOKUDB"
+VERSION = 1
+# magic, version, size of the record, reserved
+HEADER = struct.Struct("<8sHHI")
+# packed puzzle, packed solution, RNG seed (-1 if unknown), number of given cells, difficulty, flags
+RECORD = struct.Struct("<41s41siBBH")
+# offsets of the fields in the record
+PUZZLE_OFFSET = 0
+SOLUTION_OFFSET = 41
+INFO_OFFSET = 82
+NGIVEN_OFFSET = 86
+DIFFICULTY_OFFSET = 87
+PACKED_SIZE = 41
+INFO = struct.Struct("<iBBH")
+
+# flags of the record
+FLAG_UNIQUE = 1  # the puzzle is known to have exactly one solution
+
+# high and low 4 bits of each byte, as tables for bytes.translate
+HIGH_NIBBLE = bytes(b >> 4 for b in range(256))
+LOW_NIBBLE = bytes(b & 15 for b in range(256))
+
+
+def board2cells(board):
+    """ Convert the board (9x9 matrix, string as for sudoku_str2state, or 81 bytes as for sudoku.solve_buffer)
+    to bytes of 81 cell values"""
+    if isinstance(board, str):
+        board = sudoku.sudoku_str2state(board)
+    if isinstance(board, (bytes, bytearray, memoryview)):
+        cells = sudoku.buffer2cells(board)
+    else:
+        cells = bytes(v for row in board for v in row)
+    if len(cells) != 81 or max(cells) > 9:
+        my_error = ValueError("{0!r} is not a valid 9x9 Sudoku board!".format(board))
+        raise my_error
+
+    return cells
+
+def pack_cells(cells):
+    """ Pack 81 cell values (0..15) to 41 bytes, the first cell in the high 4 bits of the first byte"""
+    cells = bytes(cells) + b"\0"
+    return bytes((cells[i] << 4) | cells[i + 1] for i in range(0, 82, 2))
+
+def unpack_cells(packed, out=None):
+    """ Unpack 41 bytes, made by pack_cells, to 81 cell values in out (a writable buffer of 81 bytes,
+    a new bytearray if it is None). Return out"""
+    if out is None:
+        out = bytearray(81)
+    packed = bytes(packed)
+    out[0::2] = packed.translate(HIGH_NIBBLE)
+    out[1::2] = packed[:40].translate(LOW_NIBBLE)
+    return out
+
+
+def check_header(header, path):
+    """ Raise ValueError, if header is not the header of a store file of this version"""
+    if len(header) < HEADER.size:
+        my_error = ValueError("{0} is not a Sudoku store file!".format(path))
+        raise my_error
+    (magic, version, record_size, reserved) = HEADER.unpack_from(header)
+    if magic != MAGIC:
+        my_error = ValueError("{0} is not a Sudoku store file!".format(path))
+        raise my_error
+    if version != VERSION or record_size != RECORD.size:
+        my_error = ValueError("{0} has unsupported version {1} of the Sudoku store".format(path, version))
+        raise my_error
+
+
+class PuzzleStoreWriter:
+    """ Writer of the store file: records are appended one by one """
+
+    def __init__(self, path, append=False):
+        """ Create the store file path, or with append=True add records to the existing one"""
+        if append and os.path.exists(path):
+            self.file = open(path, "r+b")
+            check_header(self.file.read(HEADER.size), path)
+            # drop the incomplete record, left by an interrupted writer
+            size = self.file.seek(0, os.SEEK_END)
+            self.count = (size - HEADER.size) // RECORD.size
+            self.file.truncate(HEADER.size + self.count * RECORD.size)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+            self.count = 0
+
+    def add(self, puzzle, solution, seed=None, ngiven=None, difficulty=0, flags=0):
+        """ Append the puzzle and its solution (in any form, accepted by board2cells).
+        ngiven is counted from the puzzle, if not given. Return the number of the record"""
+        cells = board2cells(puzzle)
+        if ngiven is None:
+            ngiven = 81 - cells.count(0)
+        self.file.write(RECORD.pack(pack_cells(cells), pack_cells(board2cells(solution)),
+                                    -1 if seed is None else seed, ngiven, difficulty, flags))
+        self.count += 1
+        return self.count - 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PuzzleStore:
+    """ Read-only access to the store file by record number. The boards are returned packed,
+    as memoryview slices of the mapped file (no copy), or unpacked by unpack_cells to 81 bytes.
+    Only the unpacked boards are accepted by sudoku.solve_buffer. To walk many records without
+    allocating a board for each one, pass the same out buffers and scratch to cells and solve_buffer:
+        puzzle = bytearray(81)
+        solution = bytearray(81)
+        scratch = sudoku.SearchScratch()
+        for i in store.select(25):
+            if sudoku.solve_buffer(store.cells(i, puzzle), solution, True, scratch) is not None:
+                ...
+    The index by given cells count and difficulty is built on the first query.
+    All the memoryviews, returned by the store, should be released before close"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        check_header(self.map[:HEADER.size], path)
+        self.view = memoryview(self.map)
+        # an incomplete record at the end of the file is ignored
+        self.count = (len(self.map) - HEADER.size) // RECORD.size
+        self.index = None
+
+    def __len__(self):
+        return self.count
+
+    def offset(self, i):
+        if i < 0:
+            i += self.count
+        if not (0 <= i < self.count):
+            my_error = IndexError("Record {0} is out of the store of {1} records".format(i, self.count))
+            raise my_error
+        return HEADER.size + i * RECORD.size
+
+    def record(self, i):
+        """ The whole i-th record, as a memoryview"""
+        start = self.offset(i)
+        return self.view[start:start + RECORD.size]
+
+    def puzzle(self, i):
+        """ The packed puzzle of the i-th record, as a memoryview of 41 bytes (see cells for the cell values)"""
+        start = self.offset(i) + PUZZLE_OFFSET
+        return self.view[start:start + PACKED_SIZE]
+
+    def solution(self, i):
+        """ The packed solution of the i-th record, as a memoryview of 41 bytes"""
+        start = self.offset(i) + SOLUTION_OFFSET
+        return self.view[start:start + PACKED_SIZE]
+
+    def cells(self, i, out=None):
+        """ Unpack the puzzle of the i-th record to 81 cell values in out (see unpack_cells), return out.
+        With the same out for all the records no board is allocated per call (only the temporaries
+        of the 41 packed bytes), and out goes to sudoku.solve_buffer as it is"""
+        return unpack_cells(self.puzzle(i), out)
+
+    def solution_cells(self, i, out=None):
+        """ Unpack the solution of the i-th record to 81 cell values in out (see unpack_cells)"""
+        return unpack_cells(self.solution(i), out)
+
+    def info(self, i):
+        """ Metadata of the i-th record: (seed, ngiven, difficulty, flags), seed is None if unknown"""
+        (seed, ngiven, difficulty, flags) = INFO.unpack_from(self.map, self.offset(i) + INFO_OFFSET)
+        return (None if seed == -1 else seed, ngiven, difficulty, flags)
+
+    def sudoku_number(self, i):
+        """ "seed/ngiven" string of the i-th record, as shown by the game, None if the seed is unknown"""
+        (seed, ngiven, difficulty, flags) = self.info(i)
+        if seed is None:
+            return None
+        return "{0}/{1}".format(seed, ngiven)
+
+    def build_index(self):
+        """ Map (ngiven, difficulty) to the array of numbers of the records with them"""
+        end = HEADER.size + self.count * RECORD.size
+        ngivens = self.map[HEADER.size + NGIVEN_OFFSET:end:RECORD.size]
+        difficulties = self.map[HEADER.size + DIFFICULTY_OFFSET:end:RECORD.size]
+        self.index = {}
+        for (i, key) in enumerate(zip(ngivens, difficulties)):
+            if not (key in self.index):
+                self.index[key] = array("I")
+            self.index[key].append(i)
+
+    def select(self, ngiven=None, difficulty=None):
+        """ Numbers of the records with the given number of given cells and difficulty
+        (None matches any), in increasing order"""
+        if self.index is None:
+            self.build_index()
+        res = array("I")
+        for ((g, d), records) in self.index.items():
+            if ngiven in (None, g) and difficulty in (None, d):
+                res.extend(records)
+        if ngiven is None or difficulty is None:
+            res = array("I", sorted(res))
+        return res
+
+    def index_counts(self):
+        """ Number of the records for each (ngiven, difficulty)"""
+        if self.index is None:
+            self.build_index()
+        return {key: len(records) for (key, records) in self.index.items()}
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
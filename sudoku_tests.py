@@ -1,6 +1,16 @@
+import contextlib
 import copy
+import io
+import os
+import random
+import tempfile
+import threading
+import time
 
 from sudoku import *
+from sudoku_bench import make_board
+from sudoku_sat import SatSolver
+from sudoku_store import *
 from data.test_data import *
 import mytest
 
@@ -60,9 +70,508 @@ def test_board(b, nsol = 1, ngiven = None):
             else:
                 print("Test PASSED: solve_board with and without tricks yields the same solution")
 
+    for engine in ("incremental", "kernel", "dlx", "backjump", "sat"):
+        solutions_engine = tst_sud.solve_board(False, False, 5, engine=engine)
+        if sorted(solutions) != sorted(solutions_engine):
+            print("Test FAILED: {0} engine yields different solutions".format(engine))
+        else:
+            print("Test PASSED: {0} engine yields the same solutions".format(engine))
+
     for s in solutions:
         print(sudoku_state2str(s))
 
+def test_iter_solutions():
+    sud = Sudoku(board_2solutions)
+    mytest.test(sorted(sud.iter_solutions()) == sorted(sud.solve_board(False, False, 5)))
+
+    # stop early on the empty board, which has a huge number of solutions
+    sud = Sudoku()
+    solutions = []
+    for s in sud.iter_solutions(True, True):
+        solutions.append(s)
+        if len(solutions) == 3:
+            break
+    mytest.test(all(Sudoku(s).board_has_no_conflicts() and Sudoku(s).empty_cells_count() == 0 for s in solutions))
+    mytest.test(solutions[0] != solutions[1] and solutions[1] != solutions[2] and solutions[0] != solutions[2])
+
+    # a seeded randomized "incremental" search repeats itself, but draws its random numbers in another way
+    # than "classic" (see search_order), so the same seed may give another solution
+    differ = False
+    for seed in range(1, 21):
+        solutions = []
+        for engine in ("incremental", "incremental", "classic"):
+            sud = Sudoku()
+            sud.rnd_seed = seed
+            solutions.append(sud.solve_board(True, True, 1, True, engine)[0])
+        mytest.test(solutions[0] == solutions[1])
+        mytest.test(all(Sudoku(s).board_has_no_conflicts() and Sudoku(s).empty_cells_count() == 0 for s in solutions))
+        differ = differ or solutions[0] != solutions[2]
+    mytest.test(differ)
+
+def test_count_solutions():
+    for engine in ("dlx", "incremental", "kernel", "classic", "backjump", "sat"):
+        mytest.test(Sudoku(field_hard).count_solutions(2, True, engine) == 1)
+        mytest.test(Sudoku(board_2solutions).count_solutions(5, True, engine) == 2)
+        mytest.test(Sudoku(board_2solutions).count_solutions(1, True, engine) == 1)
+        mytest.test(Sudoku().count_solutions(3, True, engine) == 3)
+
+    mytest.test(Sudoku(field_hard).is_unique())
+    mytest.test(not Sudoku(board_2solutions).is_unique())
+    sud = Sudoku(board_1solution)
+    sud.state[2][8] = 7
+    mytest.test(sud.count_solutions() == 0)
+
+def test_assign():
+    # the counts, kept by assign, agree with the scans of the board
+    rng = random.Random(5)
+    for n in (4, 9, 16):
+        sud = Sudoku(make_board(n, n * n // 3, 2))
+        for step in range(500):
+            sud.assign(rng.randrange(n), rng.randrange(n), rng.randrange(n + 1))
+            if step % 100 == 99:
+                mytest.test(sud.empty_cells_count_tracked() == sud.empty_cells_count() and
+                            sud.board_has_no_conflicts_tracked() == sud.board_has_no_conflicts())
+                mytest.test(all(sud.cell_has_no_conflicts_tracked(r, c) == sud.cell_has_no_conflicts(r, c) and
+                                sud.cell_get_possibilities_tracked(r, c) == sud.cell_get_possibilities(r, c)
+                                for r in range(n) for c in range(n)))
+
+    # the replaced board is counted again
+    sud = Sudoku(field_hard)
+    sud.assign(0, 1, sud.state[0][0] or 1)
+    mytest.test(not sud.board_has_no_conflicts_tracked())
+    sud.state = Sudoku(field_hard).solve_board(False, False, 1)[0]
+    mytest.test(sud.board_has_no_conflicts_tracked() and sud.empty_cells_count_tracked() == 0)
+
+    # the cells, changed in place not by assign, are counted again by track
+    sud = Sudoku(field_hard)
+    nempty = sud.empty_cells_count_tracked()
+    (r, c) = [(r, c) for r in range(9) for c in range(9) if sud.state[r][c] != 0][0]
+    sud.state[r][c] = 0
+    sud.track()
+    mytest.test(sud.empty_cells_count_tracked() == nempty + 1 == sud.empty_cells_count())
+    sud.state[r][(c + 1) % 9] = field_hard[r][c]
+    sud.track()
+    sud.assign(r, c, field_hard[r][c])
+    mytest.test(not sud.board_has_no_conflicts_tracked() and not sud.cell_has_no_conflicts_tracked(r, c))
+
+def test_solver_stats():
+    stats = SolverStats()
+    for board in (field_hard, board_2solutions, sudoku_str2state(field_19)):
+        expected = Sudoku(board).solve_board(False, False, 2)
+        mytest.test(Sudoku(board).solve_board(False, False, 2, True, "classic", stats) == expected)
+    mytest.test(stats.solves == 3 and stats.nodes > stats.backtracks > 0 and stats.max_depth > 0)
+    mytest.test(stats.update_calls >= stats.nodes and all(v > 0 for v in stats.eliminations.values()))
+    mytest.test(stats.init_time > 0 and stats.search_time > 0 and stats.as_dict()["nodes"] == stats.nodes)
+
+    # randomized solves take the same path with and without stats
+    sud = Sudoku(field_hard)
+    sud.rnd_seed = 7
+    expected = sud.solve_board(True, True, 1)
+    sud.rnd_seed = 7
+    stats.reset()
+    mytest.test(sud.solve_board(True, True, 1, stats=stats) == expected and stats.solves == 1)
+    try:
+        sud.solve_board(False, False, 1, True, "dlx", stats)
+        mytest.test(False)
+    except ValueError:
+        mytest.test(True)
+
+def test_unique_solution():
+    solution = Sudoku(field_hard).solve_board(False, False, 1)[0]
+    sud = Sudoku(field_hard)
+    mytest.test(sud.is_unique_solution(solution) and sud.is_unique_solution(solution, None, False))
+    sud = Sudoku(solution)
+    mytest.test(sud.is_unique_solution(solution))
+
+    # removing one cell from the unique board: only that cell is searched
+    for (r, c) in ((0, 0), (0, 2), (4, 4), (8, 7)):
+        board = copy_state(field_hard)
+        board[r][c] = 0
+        sud = Sudoku(board)
+        expected = sud.count_solutions(2) == 1
+        mytest.test(sud.is_unique_solution(solution, [r * 9 + c]) == expected == sud.is_unique_solution(solution))
+
+    solutions = Sudoku(board_2solutions).solve_board(False, False, 2)
+    sud = Sudoku(board_2solutions)
+    mytest.test(not sud.is_unique_solution(solutions[0]) and not sud.is_unique_solution(solutions[1], None, False))
+    # the probes from the known possibilities leave them as they were
+    scratch = SearchScratch()
+    for (board, s, expected) in ((board_2solutions, solutions[0], False), (field_hard, solution, True)):
+        sud = Sudoku(board)
+        poss = sud.try_simple_solution_incremental()
+        before = list(poss)
+        mytest.test(sud.is_unique_solution(s, None, False, poss, scratch) == expected and poss == before)
+    for (n, ngiven) in ((4, 6), (16, 150)):
+        board = make_board(n, ngiven, 3)
+        sud = Sudoku(board)
+        expected = sud.count_solutions(2) == 1
+        mytest.test(sud.is_unique_solution(make_board(n, n * n, 3)) == expected)
+
+    # removable_clues agrees with one cell probes of is_unique_solution
+    for seed in (1, 2):
+        sud = Sudoku(solution)
+        sud.rnd_seed = seed
+        board = sud.generate_board_recursive(30)
+        expected = set()
+        for i in range(81):
+            if board[i // 9][i % 9] != 0:
+                sud = Sudoku(board)
+                sud.state[i // 9][i % 9] = 0
+                if sud.is_unique_solution(solution, [i], False):
+                    expected.add(i)
+        sud = Sudoku(board)
+        mytest.test(sud.removable_clues(solution) == expected)
+        mytest.test(sud.removable_clues(solution, sorted(expected)[:3], True) == set(sorted(expected)[:3]))
+    sud = Sudoku(field_hard)
+    mytest.test(len(sud.removable_clues(solution)) == 0)
+
+def test_backjump():
+    # all solutions are found, with and without jumps, tricks and nogoods
+    sud = Sudoku(field_hard)
+    sud.state[0][2] = 0
+    expected = sorted(sud.solve_board(False, False, 1000, True, "incremental"))
+    for backjump in (True, False):
+        for tricks in (True, False):
+            for max_nogoods in (0, 20):
+                solutions = sud.solve_board_backjump(True, True, 1000, tricks, backjump, max_nogoods)
+                mytest.test(sorted(solutions) == expected)
+    mytest.test(len(Sudoku(n=4).solve_board_backjump(False, False, 1000, False, True, 100)) == 288)
+
+    sud = Sudoku(sudoku_str2state(field_19))
+    sud.solve_board_backjump(False, False, 2, False)
+    nodes = sud.backjump_stats["nodes"]
+    sud.solve_board_backjump(False, False, 2, False, False)
+    mytest.test(sud.backjump_stats["levels_skipped"] == 0 and nodes <= sud.backjump_stats["nodes"])
+
+def test_sat():
+    def pigeonhole(npigeons, nholes):
+        solver = SatSolver(npigeons * nholes)
+        for i in range(npigeons):
+            solver.add_clause([i * nholes + j + 1 for j in range(nholes)])
+        for j in range(nholes):
+            for a in range(npigeons):
+                for b in range(a + 1, npigeons):
+                    solver.add_clause([-(a * nholes + j + 1), -(b * nholes + j + 1)])
+        return solver
+
+    mytest.test(pigeonhole(5, 4).solve() == False)
+    mytest.test(pigeonhole(5, 4).solve(3) is None)
+    solver = pigeonhole(4, 4)
+    mytest.test(solver.solve() == True and sum(solver.model) == 4)
+
+    sud = Sudoku(field_hard)
+    sud.state[0][2] = 0
+    expected = sorted(sud.solve_board(False, False, 1000, True, "incremental"))
+    mytest.test(sorted(sud.solve_board_sat(True, True, 1000)) == expected)
+    mytest.test(len(Sudoku(n=4).solve_board(False, False, 1000, True, "sat")) == 288)
+
+    board = make_board(25, 300, 4)
+    solutions = Sudoku(board).solve_board(True, True, 1, True, "sat")
+    mytest.test(len(solutions) == 1 and is_solution_of(solutions[0], board))
+
+def test_canonical_form():
+    (form, transform) = canonical_form(field_hard)
+    mytest.test(apply_transform(field_hard, transform) == form)
+
+    # transposed, with swapped bands, rows in a band, stacks, columns in a stack and renumbered values
+    rows = [6, 7, 8, 1, 0, 2, 3, 4, 5]
+    cols = [3, 5, 4, 0, 1, 2, 8, 7, 6]
+    relabel = [0, 5, 3, 9, 1, 2, 8, 7, 4, 6]
+    equivalent = apply_transform(field_hard, (True, rows, cols, relabel))
+    mytest.test(canonical_form(equivalent)[0] == form)
+    mytest.test(canonical_form(field_hard) == canonical_form(copy_state(field_hard)))
+    mytest.test(canonical_form(board_1solution)[0] != form)
+
+    solution = Sudoku(field_hard).solve_board(False, False, 1)[0]
+    (form, transform) = canonical_form(solution)
+    mytest.test(apply_transform(solution, transform) == form and form[0] == list(range(1, 10)))
+    mytest.test(canonical_form(apply_transform(solution, (True, rows, cols, relabel)))[0] == form)
+    mytest.test(canonical_form(Sudoku().state)[0] == Sudoku().state)
+
+    # a value, repeated in a row, is searched without the second row bound
+    repeated = copy_state(field_hard)
+    repeated[0][repeated[0].index(0)] = max(repeated[0])
+    (form, transform) = canonical_form(repeated)
+    mytest.test(apply_transform(repeated, transform) == form)
+    mytest.test(canonical_form(apply_transform(repeated, (False, rows, cols, relabel)))[0] == form)
+
+def test_count_cache():
+    cache = SolutionCountCache(2)
+    mytest.test(cache.get(field_hard) is None)
+    cache.put(field_hard, 2, 1)
+    cache.put(board_2solutions, 2, 2)
+    mytest.test(cache.get(field_hard) == 1)
+    # 2 solutions, counted up to 2, are not enough to answer for limit 5
+    mytest.test(cache.get(board_2solutions, 1) == 1 and cache.get(board_2solutions, 5) is None)
+    cache.put(board_1solution, 2, 1)
+    # field_hard is the least recently used one
+    mytest.test(cache.get(field_hard) is None and cache.get(board_2solutions) == 2)
+    mytest.test(cache.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 3, "evictions": 1})
+
+    # equivalent boards share the entry
+    relabeled = [[(v % 9) + 1 if v != 0 else 0 for v in row] for row in field_hard]
+    relabeled = [[relabeled[r][c] for r in range(9)] for c in range(9)]
+    mytest.test(pack_state(relabeled) != pack_state(field_hard))
+    cache = SolutionCountCache(10, True)
+    cache.put(field_hard, 2, 1)
+    mytest.test(cache.get(relabeled) == 1 and cache.hits == 1)
+    # the key of the last board is reused, a board changed in place gets its own key
+    board = copy_state(field_hard)
+    mytest.test(cache.get(board) == 1 and cache.last_key[0] == pack_state(field_hard))
+    board[0][0] = 9 - board[0][1] if board[0][0] == 0 else 0
+    mytest.test(cache.get(board) is None and cache.last_key[0] == pack_state(board))
+
+    sud = Sudoku(field_hard)
+    sud.count_cache = SolutionCountCache()
+    sud.clear_issolvable_cache()
+    mytest.test(sud.memo_nsolutions() == (1, False) and sud.memo_nsolutions() == (1, True))
+    sud.clear_issolvable_cache()
+    mytest.test(sud.memo_nsolutions() == (1, False) and sud.count_cache.hits == 2)
+
+def test_buffer():
+    line = sudoku_state2line(field_hard).encode()
+    expected = sudoku_state2line(Sudoku(field_hard).solve_board(False, False, 1)[0]).encode()
+    mytest.test(solve_buffer(line) == expected)
+    mytest.test(solve_buffer(line.replace(b"0", b".")) == expected)
+    # raw values in and out, the solution is written into a slice of a larger buffer
+    out = bytearray(100)
+    solve_buffer(memoryview(bytearray(line)).cast("B"), memoryview(out)[10:91])
+    mytest.test(bytes(out[10:91]) == expected and out[:10] == bytes(10) and out[91:] == bytes(9))
+    raw = buffer2cells(line)
+    mytest.test(solve_buffer(raw) == buffer2cells(expected))
+
+    mytest.test(is_unique_buffer(line) and is_unique_buffer(bytearray(line), out))
+    mytest.test(bytes(out[:81]) == expected)
+    mytest.test(not is_unique_buffer(sudoku_state2line(board_2solutions).encode()))
+    conflicting = b"5" + sudoku_state2line(board_1solution).encode()[1:]
+    mytest.test(solve_buffer(conflicting) is None and not is_unique_buffer(conflicting))
+    for bad in (line[:80], line[:80] + b"x"):
+        try:
+            solve_buffer(bad)
+            mytest.test(False)
+        except ValueError:
+            mytest.test(True)
+
+    # a scratch, reused for the boards, and searches from several threads at once
+    scratch = SearchScratch()
+    mytest.test(solve_buffer(conflicting, None, True, scratch) is None)
+    mytest.test(solve_buffer(line, None, True, scratch) == expected)
+    lines = [sudoku_state2line(board).encode() for board in (field_hard, board_1solution, board_2solutions)]
+    lines.append("".join(field_19.split()).encode())
+    answers = [solve_buffer(l) for l in lines]
+    results = []
+
+    def solve_lines_thread():
+        for i in range(20):
+            results.append(solve_buffer(lines[i % len(lines)]) == answers[i % len(lines)])
+
+    threads = [threading.Thread(target=solve_lines_thread) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    mytest.test(len(results) == 80 and all(results))
+
+def test_command_line():
+    lines = [sudoku_state2line(field_hard).replace("0", "."), sudoku_state2line(board_2solutions), "123"]
+    expected = sudoku_state2line(Sudoku(field_hard).solve_board(False, False, 1)[0])
+    answers = [answer for (answer, t) in solve_lines(lines)]
+    mytest.test(answers[0] == expected and len(answers[1]) == 81 and answers[2] == "invalid")
+    answers = [answer for (answer, t) in solve_lines(lines, True)]
+    mytest.test(answers == ["unique", "multiple", "invalid"])
+
+    path = os.path.join(tempfile.mkdtemp(), "boards.txt")
+    with open(path, "w") as f:
+        f.write("# boards\n" + "\n".join(lines * 3) + "\n\n")
+    for workers in ("1", "2"):
+        out = io.StringIO()
+        err = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            main(["solve", "--unique", "-j", workers, "--chunksize", "2", path])
+        mytest.test(out.getvalue() == "unique\nmultiple\ninvalid\n" * 3)
+        mytest.test(err.getvalue().startswith("9 boards in ") and "p99" in err.getvalue())
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+def test_store():
+    solution = Sudoku(field_hard).solve_board(False, False, 1)[0]
+    path = os.path.join(tempfile.mkdtemp(), "boards.sdb")
+    with PuzzleStoreWriter(path) as writer:
+        mytest.test(writer.add(field_hard, solution, 123, difficulty=3, flags=FLAG_UNIQUE) == 0)
+        writer.add(field_19, sudoku_state2line(solution))
+    with PuzzleStoreWriter(path, True) as writer:
+        mytest.test(writer.add(board_1solution, board_1solution, 5, difficulty=3) == 2)
+
+    with PuzzleStore(path) as store:
+        mytest.test(len(store) == 3 and len(store.puzzle(0)) == 41)
+        mytest.test(store.cells(0) == board2cells(field_hard) and store.cells(1) == board2cells(field_19))
+        out = bytearray(81)
+        store.solution_cells(1, out)
+        mytest.test(out == board2cells(solution) and store.cells(-1, out) == board2cells(board_1solution))
+        mytest.test(store.info(0) == (123, 20, 3, FLAG_UNIQUE) and store.info(1) == (None, 19, 0, 0))
+        mytest.test(store.sudoku_number(0) == "123/20" and store.sudoku_number(1) is None)
+        mytest.test(solve_buffer(store.cells(0)) == store.solution_cells(0))
+        # the packed puzzle is not a board, the cells are unpacked to the buffers, reused for all records
+        packed = store.puzzle(0)
+        try:
+            solve_buffer(packed)
+            mytest.test(False)
+        except ValueError:
+            mytest.test(True)
+        packed.release()
+        (puzzle, solved) = (bytearray(81), bytearray(81))
+        for i in range(len(store)):
+            mytest.test(store.cells(i, puzzle) is puzzle and solve_buffer(puzzle, solved) is solved)
+            mytest.test(solved == solve_buffer(store.cells(i)))
+        mytest.test(list(store.select(difficulty=3)) == [0, 2] and list(store.select(19)) == [1])
+        mytest.test(list(store.select(81, 0)) == [] and store.index_counts()[(20, 3)] == 1)
+        try:
+            store.info(3)
+            mytest.test(False)
+        except IndexError:
+            mytest.test(True)
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+def test_solve_batch():
+    try:
+        import numpy as np
+        import sudoku_batch
+    except ImportError:
+        print("NumPy is not installed, skipping solve_batch tests")
+        return
+
+    conflicting = copy_state(board_1solution)
+    conflicting[0][0] = 5
+    boards = [field_hard, board_2solutions, board_1solution, conflicting]
+    puzzles = np.array([[v for row in b for v in row] for b in boards], dtype=np.uint8)
+    (solutions, status) = sudoku_batch.solve_batch(puzzles, True)
+
+    expected = Sudoku(field_hard).solve_board(False, False, 1)[0]
+    mytest.test(solutions[0].reshape(9, 9).tolist() == expected)
+    mytest.test(status[0] in (sudoku_batch.BATCH_SOLVED, sudoku_batch.BATCH_SEARCHED))
+    mytest.test(status[1] == sudoku_batch.BATCH_MULTIPLE)
+    mytest.test(status[2] == sudoku_batch.BATCH_SOLVED)
+    mytest.test(solutions[2].reshape(9, 9).tolist() == board_1solution)
+    mytest.test(status[3] == sudoku_batch.BATCH_UNSOLVABLE)
+
+def test_solve_many():
+    puzzles = [field_hard, field_19, board_2solutions, sudoku_state2line(board_1solution).replace("2", ".")]
+    expected = []
+    for p in puzzles:
+        if isinstance(p, str):
+            p = sudoku_str2state(p)
+        expected.append(Sudoku(p).solve_board(False, False, 2))
+
+    mytest.test(list(solve_many(puzzles * 3, 2, 2, 2)) == expected * 3)
+    mytest.test(list(solve_many(puzzles, 1, nsolutions=2)) == expected)
+    # boards of other sizes are rejected before they are sent to the workers
+    for bad in (sudoku_state2line(make_board(16, 100, 1)), make_board(4, 6, 1), [[10] * 9] * 9):
+        try:
+            list(solve_many([field_hard, bad], 2))
+            mytest.test(False)
+        except ValueError:
+            mytest.test(True)
+
+def test_generate_many():
+    for method in ("annealing", "recursive"):
+        results = sorted(generate_many(4, 25, method, 2, 11))
+        mytest.test([r[0] for r in results] == list(range(4)))
+        mytest.test(sorted(generate_many(4, 25, method, 1, 11)) == results)
+        for (i, seed, board) in results:
+            sud = Sudoku(board)
+            mytest.test(seed == task_seed(11, i) and sud.given_cells_count() == 25 and sud.is_unique())
+            mytest.test(generate_puzzle(seed, 25, method) == board)
+
+    # with the solve calls running out, the board still depends on the seed only,
+    # not on the boards in the shared count cache (all of them are there for the second run)
+    boards = [generate_puzzle(seed, 24, "recursive", 400) for seed in range(21, 33)]
+    mytest.test(None in boards and [generate_puzzle(seed, 24, "recursive", 400) for seed in range(21, 33)] == boards)
+
+    # the task gives up at the timeout
+    mytest.test(list(generate_many(1, 17, "annealing", 1, 0, 10 ** 6, 0.5)) == [(0, task_seed(0, 0), None)])
+    mytest.test(len(set(task_seed(0, i) for i in range(1000))) == 1000)
+
+def test_generate_timeout():
+    mytest.test(generate_timeout(60, 30) == 60 and generate_timeout(60, 25) == 60)
+    mytest.test(generate_timeout(60, 23) == 240 and generate_timeout(60, 20) == 60 * 32)
+    # each replaced worker doubles the time, so a slow board gets enough of it after a few replacements
+    mytest.test([generate_timeout(1, 25, k) for k in range(4)] == [1, 2, 4, 8])
+    mytest.test(generate_timeout(1, 24, 2) == 8 and generate_timeout(0.5, 26, 1) == 1)
+
+def test_puzzle_pool():
+    try:
+        from sudoku_game import PuzzlePool
+    except ImportError:
+        print("pygame is not installed, skipping PuzzlePool tests")
+        return
+
+    # the replaced worker makes the field all the same
+    pool = PuzzlePool((30,), 1)
+    mytest.test(pool.take(30) is None and pool.task_timeout(23) == generate_timeout(60, 23))
+    pool.restart()
+    mytest.test(pool.restarts == 1 and pool.task_timeout(23) == generate_timeout(60, 23, 1))
+    field = None
+    deadline = time.perf_counter() + 60
+    while field is None and time.perf_counter() < deadline:
+        field = pool.take(30)
+        time.sleep(0.01)
+    pool.close()
+    mytest.test(pool.restarts == 0)
+    mytest.test(field is not None and Sudoku(field[1]).given_cells_count() == 30 and Sudoku(field[1]).is_unique())
+
+def is_solution_of(solution, board):
+    """ Check that solution is a filled board without conflicts, keeping all given cells of the board"""
+    sud = Sudoku(solution)
+    if sud.empty_cells_count() != 0 or not sud.board_has_no_conflicts():
+        return False
+    n = len(board)
+    return all(board[r][c] in (0, solution[r][c]) for r in range(n) for c in range(n))
+
+def test_nxn():
+    for (n, ngiven) in ((4, 6), (16, 100), (25, 320)):
+        board = make_board(n, ngiven, 1)
+        sud = Sudoku(board)
+        mytest.test(sud.n == n and sud.given_cells_count() == ngiven)
+        mytest.test(sudoku_str2state(sudoku_state2line(board)) == board)
+
+        solutions = sud.solve_board(False, False, 1)
+        mytest.test(len(solutions) == 1 and is_solution_of(solutions[0], board))
+        first = next(sud.iter_solutions(True, True))
+        mytest.test(is_solution_of(first, board))
+
+    # the empty board has a lot of solutions
+    sud = Sudoku(n=16)
+    mytest.test(sud.count_solutions(3) == 3)
+    mytest.test(is_solution_of(sud.solve_board()[0], sud.state))
+
+    board = sudoku_str2state("1234 3412 2... ....")
+    mytest.test(Sudoku(board).count_solutions(5) == 2)
+    board[2][1] = 1
+    mytest.test(Sudoku(board).count_solutions(5) == 1)
+    board[3][0] = 2
+    mytest.test(Sudoku(board).count_solutions(5) == 0)
+
+    # the generators work on any size, the tricks of the classic propagation on 9x9 only
+    for (n, ngiven) in ((4, 5), (16, 140)):
+        sud = Sudoku(make_board(n, n * n, 2))
+        sud.rnd_seed = 7
+        for board in (sud.generate_board_recursive(ngiven, 1000), sud.generate_board_annealing(ngiven, 100)):
+            mytest.test(Sudoku(board).given_cells_count() == ngiven and Sudoku(board).is_unique())
+            mytest.test(is_solution_of(sud.state, board))
+    sud = Sudoku(n=4)
+    board = sud.generate_from_bottom(8)
+    mytest.test(Sudoku(board).is_unique() and sud.state == Sudoku(n=4).state)
+    mytest.test(len(sud.find_key_cells()) == 16)
+
+    for bad in (lambda: Sudoku(n=10), lambda: Sudoku([[0] * 9] * 8), lambda: Sudoku([[17] * 16] * 16),
+                lambda: Sudoku(n=16).try_simple_solution(), lambda: Sudoku(n=4).do_tricks([15] * 16)):
+        try:
+            bad()
+            mytest.test(False)
+        except ValueError:
+            mytest.test(True)
+
 def generate_annealing_and_test(sud, n, maxiter = 1000):
      sud.state=generate_random_filled_board(sud,1)[0]
      board = sud.generate_board_annealing(n, maxiter, False)
@@ -94,6 +603,58 @@ if __name__ == "__main__":
     print("Solving field with more than 1 solution")
     test_board(board_2solutions, 2)
 
+    print("Enumerating solutions with iter_solutions")
+    test_iter_solutions()
+
+    print("Counting solutions")
+    test_count_solutions()
+
+    print("Tracking the values of the units with assign")
+    test_assign()
+
+    print("Checking uniqueness against the known solution")
+    test_unique_solution()
+
+    print("Collecting statistics of the solver")
+    test_solver_stats()
+
+    print("Solving boards with backjumping")
+    test_backjump()
+
+    print("Solving boards with the SAT solver")
+    test_sat()
+
+    print("Canonical forms of boards")
+    test_canonical_form()
+
+    print("Caching numbers of solutions")
+    test_count_cache()
+
+    print("Solving boards in buffers")
+    test_buffer()
+
+    print("Solving boards from the command line")
+    test_command_line()
+
+    print("Storing boards in the binary store")
+    test_store()
+
+    print("Solving boards with solve_batch")
+    test_solve_batch()
+
+    print("Solving boards with solve_many")
+    test_solve_many()
+
+    print("Generating boards with generate_many")
+    test_generate_many()
+
+    print("Generating fields for the game in the background")
+    test_generate_timeout()
+    test_puzzle_pool()
+
+    print("Solving 4x4, 16x16 and 25x25 boards")
+    test_nxn()
+
     print("try to generate new filled board from scratch")
     sud = Sudoku()
     sud.rnd_seed = 1234